@@ -0,0 +1,867 @@
+"""
+Local stand-in for the Github API endpoints used by the Workflow Spreader
+"""
+
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def git_blob_sha(content):
+    '''
+    Calculate the git blob SHA of a content
+    '''
+
+    return hashlib.sha1(
+        f"blob {len(content)}\0".encode('utf-8') + content
+    ).hexdigest()
+
+
+class FakeRepository:  # pylint: disable=too-few-public-methods
+    '''
+    In-memory Repository: commits are snapshots of the files by path
+    '''
+
+    def __init__(self, name, files):
+        '''
+        FakeRepository Constructor
+        '''
+
+        self.name = name
+        self.default_branch = 'main'
+        self.commits = {}
+        self.branches = {}
+        self.pulls = {}
+        self.review_requests = {}
+        self.pushed_at = '2024-01-01T00:00:00Z'
+        self.topics = []
+        self.properties = {}
+        self.archived = False
+        self.disabled = False
+        self.fork = False
+        self.visibility = 'private'
+        self.size = 100
+        self.branches[self.default_branch] = self.add_commit(files)
+
+    def add_commit(self, files):
+        '''
+        Stores a snapshot of files, returns its SHA
+        '''
+
+        tree_sha = hashlib.sha1(
+            json.dumps(
+                {path: git_blob_sha(content) for path, content
+                 in files.items()},
+                sort_keys=True
+            ).encode('utf-8')
+        ).hexdigest()
+        sha = hashlib.sha1(
+            f"{self.name}:{len(self.commits)}:{tree_sha}".encode('utf-8')
+        ).hexdigest()
+        self.commits[sha] = {
+            'tree': tree_sha,
+            'files': files
+        }
+
+        return sha
+
+
+class FakeGithub:
+    '''
+    Fake Github API serving a synthetic Organization over HTTP.
+    Requests are counted by endpoint template, can be delayed to simulate
+    the network latency and are charged against a rate limit budget.
+    '''
+
+    repo_url_resources = (
+        'archive', 'assignees', 'blobs', 'branches', 'collaborators',
+        'comments', 'commits', 'compare', 'contents', 'contributors',
+        'deployments', 'downloads', 'events', 'forks', 'git_commits',
+        'git_refs', 'git_tags', 'hooks', 'issue_comment', 'issue_events',
+        'issues', 'keys', 'labels', 'languages', 'merges', 'milestones',
+        'notifications', 'pulls', 'releases', 'stargazers', 'statuses',
+        'subscribers', 'subscription', 'tags', 'teams', 'trees'
+    )
+
+    def __init__(
+            self, organization, latency=0, rate_limit=1000000000,
+            rate_window=3600):
+        '''
+        FakeGithub Constructor
+        latency is the delay of every response in seconds, rate_limit the
+        number of requests allowed every rate_window seconds
+        '''
+
+        self.organization = organization
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.rate_remaining = rate_limit
+        self.rate_reset = int(time.time()) + rate_window
+        self.repositories = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.server = None
+        self.routes = [
+            ('GET', r'/orgs/(?P<org>[^/]+)', self.get_org),
+            ('GET', r'/orgs/(?P<org>[^/]+)/repos', self.get_org_repos),
+            ('GET', r'/orgs/(?P<org>[^/]+)/properties/values',
+             self.get_org_properties),
+            ('GET', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)',
+             self.get_repo),
+            ('GET', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/contents/'
+             r'(?P<path>.+)', self.get_contents),
+            ('GET', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/branches/'
+             r'(?P<branch>.+)', self.get_branch),
+            ('GET', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/git/refs/heads/'
+             r'(?P<branch>.+)', self.get_ref),
+            ('PATCH', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/git/refs/'
+             r'heads/(?P<branch>.+)', self.update_ref),
+            ('POST', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/git/refs',
+             self.create_ref),
+            ('GET', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/git/commits/'
+             r'(?P<sha>[^/]+)', self.get_commit),
+            ('POST', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/git/trees',
+             self.create_tree),
+            ('POST', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/git/commits',
+             self.create_commit),
+            ('GET', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/pulls',
+             self.get_pulls),
+            ('POST', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/pulls',
+             self.create_pull),
+            ('GET', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/pulls/'
+             r'(?P<number>\d+)', self.get_pull),
+            ('PATCH', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/pulls/'
+             r'(?P<number>\d+)', self.update_pull),
+            ('GET', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/pulls/'
+             r'(?P<number>\d+)/requested_reviewers',
+             self.get_review_requests),
+            ('POST', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/pulls/'
+             r'(?P<number>\d+)/requested_reviewers',
+             self.create_review_requests),
+            ('POST', r'/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/issues/'
+             r'(?P<number>\d+)/comments', self.create_comment),
+            ('POST', r'/graphql', self.graphql),
+        ]
+
+    def add_repository(self, name, files):
+        '''
+        Adds a Repository with files on its default Branch
+        Returns the Repository, so that its metadata can be set
+        '''
+
+        self.repositories[name] = FakeRepository(name, files)
+
+        return self.repositories[name]
+
+    def get_url(self):
+        '''
+        Returns the base URL of the running API
+        '''
+
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        '''
+        Serves the API on a random local port
+        '''
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                '''
+                Routes a GET request
+                '''
+
+                fake.handle(self)
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                '''
+                Routes a POST request
+                '''
+
+                fake.handle(self)
+
+            def do_PATCH(self):  # pylint: disable=invalid-name
+                '''
+                Routes a PATCH request
+                '''
+
+                fake.handle(self)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                '''
+                Keeps the requests out of the benchmark output
+                '''
+
+                return
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+
+        threading.Thread(
+            target=self.server.serve_forever,
+            daemon=True
+        ).start()
+
+        return self.get_url()
+
+    def stop(self):
+        '''
+        Stops serving the API
+        '''
+
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_template(self, pattern):
+        '''
+        Turns a route pattern into a readable endpoint template
+        '''
+
+        return re.sub(r'\(\?P<(\w+)>[^)]*\)', r'{\1}', pattern)
+
+    def handle(self, request):
+        '''
+        Routes a request and sends the response
+        '''
+
+        url = urllib.parse.urlparse(request.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        length = int(request.headers.get('Content-Length') or 0)
+        body = json.loads(request.rfile.read(length)) if length else None
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        for verb, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, url.path)
+
+            if verb != request.command or not match:
+                continue
+
+            template = f"{verb} {self.get_template(pattern)}"
+            params = {
+                name: urllib.parse.unquote(value)
+                for name, value in match.groupdict().items()
+            }
+
+            with self.lock:
+                self.counts[template] = self.counts.get(template, 0) + 1
+
+                if time.time() >= self.rate_reset:
+                    self.rate_remaining = self.rate_limit
+                    self.rate_reset = int(time.time()) + self.rate_window
+
+                if self.rate_remaining <= 0:
+                    return self.send(request, 403, {
+                        'message': 'API rate limit exceeded'
+                    })
+
+                status, data, *headers = handler(params, query, body)
+                content = json.dumps(data)
+                etag = f"\"{hashlib.sha1(content.encode()).hexdigest()}\""
+
+                # Conditional requests are not charged
+                if verb == 'GET' \
+                   and request.headers.get('If-None-Match') == etag:
+                    return self.send(request, 304, None, etag)
+
+                self.rate_remaining -= 1
+
+            return self.send(
+                request, status, data, etag, headers[0] if headers else None
+            )
+
+        with self.lock:
+            template = f"{request.command} (unknown) {url.path}"
+            self.counts[template] = self.counts.get(template, 0) + 1
+
+        return self.send(request, 404, {'message': 'Not Found'})
+
+    def send(  # pylint: disable=too-many-arguments
+            self, request, status, data, etag=None, headers=None):
+        '''
+        Sends a JSON response with the rate limit headers
+        '''
+
+        content = b'' if data is None else json.dumps(data).encode('utf-8')
+
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(content)))
+        request.send_header('X-RateLimit-Limit', str(self.rate_limit))
+        request.send_header(
+            'X-RateLimit-Remaining', str(max(0, self.rate_remaining))
+        )
+        request.send_header('X-RateLimit-Reset', str(self.rate_reset))
+
+        if etag and status == 200:
+            request.send_header('ETag', etag)
+
+        for name, value in (headers if headers else {}).items():
+            request.send_header(name, value)
+
+        request.end_headers()
+        request.wfile.write(content)
+
+    # JSON representations
+
+    def repo_url(self, name):
+        '''
+        Returns the API URL of a Repository
+        '''
+
+        return f"{self.get_url()}/repos/{self.organization}/{name}"
+
+    def repo_json(self, repository):
+        '''
+        Returns a Repository payload, as listed by Github
+        '''
+
+        url = self.repo_url(repository.name)
+
+        return {
+            'id': abs(hash(repository.name)) % 1000000000,
+            'node_id': f"R_{repository.name}",
+            'name': repository.name,
+            'full_name': f"{self.organization}/{repository.name}",
+            'owner': {
+                'login': self.organization,
+                'type': 'Organization',
+                'url': f"{self.get_url()}/users/{self.organization}",
+                'repos_url':
+                    f"{self.get_url()}/users/{self.organization}/repos"
+            },
+            'url': url,
+            # Github lists every Repository with these URLs
+            **{
+                f"{resource}_url": f"{url}/{resource}"
+                for resource in self.repo_url_resources
+            },
+            'description': f"Synthetic Repository {repository.name}",
+            'homepage': None,
+            'language': 'PHP',
+            'stargazers_count': 0,
+            'watchers_count': 0,
+            'forks_count': 0,
+            'open_issues_count': 0,
+            'has_issues': True,
+            'has_projects': True,
+            'has_wiki': True,
+            'created_at': repository.pushed_at,
+            'updated_at': repository.pushed_at,
+            'permissions': {'admin': True, 'push': True, 'pull': True},
+            'default_branch': repository.default_branch,
+            'archived': repository.archived,
+            'disabled': repository.disabled,
+            'fork': repository.fork,
+            'private': repository.visibility != 'public',
+            'visibility': repository.visibility,
+            'size': repository.size,
+            'pushed_at': repository.pushed_at,
+            'topics': repository.topics
+        }
+
+    def pull_json(self, repository, number):
+        '''
+        Returns a Pull Request payload
+        '''
+
+        pull = repository.pulls[number]
+        url = self.repo_url(repository.name)
+
+        return {
+            'number': number,
+            'state': 'open',
+            'title': pull['title'],
+            'url': f"{url}/pulls/{number}",
+            'issue_url': f"{url}/issues/{number}",
+            'head': {
+                'ref': pull['head'],
+                'label': f"{self.organization}:{pull['head']}",
+                'sha': repository.branches.get(pull['head'])
+            },
+            'base': {
+                'ref': repository.default_branch
+            }
+        }
+
+    def ref_json(self, repository, branch):
+        '''
+        Returns a Branch ref payload
+        '''
+
+        return {
+            'ref': f"refs/heads/{branch}",
+            'url': f"{self.repo_url(repository.name)}/git/refs/heads/"
+            f"{branch}",
+            'object': {
+                'sha': repository.branches[branch],
+                'type': 'commit'
+            }
+        }
+
+    def commit_json(self, repository, sha):
+        '''
+        Returns a git commit payload
+        '''
+
+        return {
+            'sha': sha,
+            'url': f"{self.repo_url(repository.name)}/git/commits/{sha}",
+            'tree': {
+                'sha': repository.commits[sha]['tree']
+            }
+        }
+
+    # Routes
+
+    def get_org(self, params, query, body):
+        '''
+        GET /orgs/{org}
+        '''
+
+        del query, body
+
+        return 200, {
+            'login': params['org'],
+            'url': f"{self.get_url()}/orgs/{params['org']}"
+        }
+
+    def get_org_repos(self, params, query, body):
+        '''
+        GET /orgs/{org}/repos, paginated with a Link header
+        '''
+
+        del body
+
+        page = int(query.get('page', 1))
+        per_page = int(query.get('per_page', 30))
+        names = sorted(self.repositories)
+        data = [
+            self.repo_json(self.repositories[name])
+            for name in names[(page - 1) * per_page:page * per_page]
+        ]
+
+        if page * per_page < len(names):
+            next_url = f"{self.get_url()}/orgs/{params['org']}/repos?" \
+                f"per_page={per_page}&page={page + 1}"
+
+            return 200, data, {'Link': f"<{next_url}>; rel=\"next\""}
+
+        return 200, data
+
+    def get_org_properties(self, params, query, body):
+        '''
+        GET /orgs/{org}/properties/values
+        '''
+
+        del params, body
+
+        page = int(query.get('page', 1))
+        per_page = int(query.get('per_page', 30))
+        names = sorted(self.repositories)
+
+        return 200, [
+            {
+                'repository_id': self.repo_json(
+                    self.repositories[name]
+                )['id'],
+                'repository_name': name,
+                'repository_full_name': f"{self.organization}/{name}",
+                'properties': [
+                    {'property_name': property_name, 'value': value}
+                    for property_name, value
+                    in self.repositories[name].properties.items()
+                ]
+            }
+            for name in names[(page - 1) * per_page:page * per_page]
+        ]
+
+    def get_repository(self, params):
+        '''
+        Returns the FakeRepository named in the route
+        '''
+
+        return self.repositories.get(params['repo'])
+
+    def get_repo(self, params, query, body):
+        '''
+        GET /repos/{org}/{repo}
+        '''
+
+        del query, body
+
+        repository = self.get_repository(params)
+
+        if repository is None:
+            return 404, {'message': 'Not Found'}
+
+        return 200, self.repo_json(repository)
+
+    def get_contents(self, params, query, body):
+        '''
+        GET /repos/{org}/{repo}/contents/{path}, a file or a directory listing
+        '''
+
+        del body
+
+        repository = self.get_repository(params)
+        branch = query.get('ref', repository.default_branch)
+
+        if branch not in repository.branches:
+            return 404, {'message': 'No commit found for the ref'}
+
+        files = repository.commits[repository.branches[branch]]['files']
+        path = params['path']
+        url = self.repo_url(repository.name)
+
+        if path in files:
+            return 200, {
+                'type': 'file',
+                'encoding': 'base64',
+                'name': path.split('/')[-1],
+                'path': path,
+                'sha': git_blob_sha(files[path]),
+                'size': len(files[path]),
+                'url': f"{url}/contents/{path}",
+                'content': base64.b64encode(files[path]).decode('ascii')
+            }
+
+        listing = [
+            {
+                'type': 'file',
+                'name': file_path.split('/')[-1],
+                'path': file_path,
+                'sha': git_blob_sha(content),
+                'size': len(content),
+                'url': f"{url}/contents/{file_path}"
+            }
+            for file_path, content in sorted(files.items())
+            if file_path.rsplit('/', 1)[0] == path
+        ]
+
+        if not listing:
+            return 404, {'message': 'Not Found'}
+
+        return 200, listing
+
+    def get_branch(self, params, query, body):
+        '''
+        GET /repos/{org}/{repo}/branches/{branch}
+        '''
+
+        del query, body
+
+        repository = self.get_repository(params)
+
+        if params['branch'] not in repository.branches:
+            return 404, {'message': 'Branch not found'}
+
+        return 200, {
+            'name': params['branch'],
+            'commit': {
+                'sha': repository.branches[params['branch']],
+                'url': f"{self.repo_url(repository.name)}/commits/"
+                f"{repository.branches[params['branch']]}"
+            }
+        }
+
+    def get_ref(self, params, query, body):
+        '''
+        GET /repos/{org}/{repo}/git/refs/heads/{branch}
+        '''
+
+        del query, body
+
+        repository = self.get_repository(params)
+
+        if params['branch'] not in repository.branches:
+            return 404, {'message': 'Not Found'}
+
+        return 200, self.ref_json(repository, params['branch'])
+
+    def create_ref(self, params, query, body):
+        '''
+        POST /repos/{org}/{repo}/git/refs
+        '''
+
+        del query
+
+        repository = self.get_repository(params)
+        branch = body['ref'][len('refs/heads/'):]
+
+        if branch in repository.branches:
+            return 422, {'message': 'Reference already exists'}
+
+        repository.branches[branch] = body['sha']
+
+        return 201, self.ref_json(repository, branch)
+
+    def update_ref(self, params, query, body):
+        '''
+        PATCH /repos/{org}/{repo}/git/refs/heads/{branch}
+        '''
+
+        del query
+
+        repository = self.get_repository(params)
+        repository.branches[params['branch']] = body['sha']
+
+        return 200, self.ref_json(repository, params['branch'])
+
+    def get_commit(self, params, query, body):
+        '''
+        GET /repos/{org}/{repo}/git/commits/{sha}
+        '''
+
+        del query, body
+
+        return 200, self.commit_json(
+            self.get_repository(params),
+            params['sha']
+        )
+
+    def create_tree(self, params, query, body):
+        '''
+        POST /repos/{org}/{repo}/git/trees
+        '''
+
+        del query
+
+        repository = self.get_repository(params)
+        files = {}
+
+        # Trees are only referenced by their base commit snapshot
+        for commit in repository.commits.values():
+            if commit['tree'] == body.get('base_tree'):
+                files = dict(commit['files'])
+                break
+
+        for element in body['tree']:
+            files[element['path']] = element['content'].encode('utf-8')
+
+        sha = repository.add_commit(files)
+
+        return 201, {
+            'sha': repository.commits[sha]['tree'],
+            'url': f"{self.repo_url(repository.name)}/git/trees/"
+            f"{repository.commits[sha]['tree']}",
+            'tree': []
+        }
+
+    def create_commit(self, params, query, body):
+        '''
+        POST /repos/{org}/{repo}/git/commits
+        '''
+
+        del query
+
+        repository = self.get_repository(params)
+
+        for sha, commit in list(repository.commits.items()):
+            if commit['tree'] == body['tree']:
+                new_sha = repository.add_commit(commit['files'])
+
+                return 201, self.commit_json(repository, new_sha)
+
+        return 422, {'message': 'Tree not found'}
+
+    def get_pulls(self, params, query, body):
+        '''
+        GET /repos/{org}/{repo}/pulls
+        '''
+
+        del body
+
+        repository = self.get_repository(params)
+        head = query.get('head', '').split(':')[-1]
+
+        return 200, [
+            self.pull_json(repository, number)
+            for number, pull in sorted(repository.pulls.items())
+            if not head or pull['head'] == head
+        ]
+
+    def create_pull(self, params, query, body):
+        '''
+        POST /repos/{org}/{repo}/pulls
+        '''
+
+        del query
+
+        repository = self.get_repository(params)
+
+        if any(
+            pull['head'] == body['head'] for pull in repository.pulls.values()
+        ):
+            return 422, {
+                'message': 'Validation Failed',
+                'errors': [{
+                    'message': 'A pull request already exists for '
+                    f"{self.organization}:{body['head']}."
+                }]
+            }
+
+        number = len(repository.pulls) + 1
+        repository.pulls[number] = {
+            'title': body['title'],
+            'head': body['head']
+        }
+        repository.review_requests[number] = []
+
+        return 201, self.pull_json(repository, number)
+
+    def get_pull(self, params, query, body):
+        '''
+        GET /repos/{org}/{repo}/pulls/{number}
+        '''
+
+        del query, body
+
+        repository = self.get_repository(params)
+
+        return 200, self.pull_json(repository, int(params['number']))
+
+    def update_pull(self, params, query, body):
+        '''
+        PATCH /repos/{org}/{repo}/pulls/{number}
+        '''
+
+        del query
+
+        repository = self.get_repository(params)
+        number = int(params['number'])
+
+        if 'title' in body:
+            repository.pulls[number]['title'] = body['title']
+
+        return 200, self.pull_json(repository, number)
+
+    def get_review_requests(self, params, query, body):
+        '''
+        GET /repos/{org}/{repo}/pulls/{number}/requested_reviewers
+        '''
+
+        del query, body
+
+        repository = self.get_repository(params)
+
+        return 200, {
+            'users': [],
+            'teams': [
+                {
+                    'slug': slug,
+                    'name': slug,
+                    'url': f"{self.get_url()}/teams/{slug}"
+                }
+                for slug in repository.review_requests.get(
+                    int(params['number']), []
+                )
+            ]
+        }
+
+    def create_review_requests(self, params, query, body):
+        '''
+        POST /repos/{org}/{repo}/pulls/{number}/requested_reviewers
+        '''
+
+        del query
+
+        repository = self.get_repository(params)
+        number = int(params['number'])
+        repository.review_requests.setdefault(number, []).extend(
+            body.get('team_reviewers', [])
+        )
+
+        return 201, self.pull_json(repository, number)
+
+    def create_comment(self, params, query, body):
+        '''
+        POST /repos/{org}/{repo}/issues/{number}/comments
+        '''
+
+        del query
+
+        return 201, {
+            'id': 1,
+            'body': body['body'],
+            'url': f"{self.repo_url(params['repo'])}/issues/comments/1"
+        }
+
+    def graphql(self, params, query, body):
+        '''
+        Answers the GraphQL queries of the Spreader, driven by their
+        variables
+        '''
+
+        del params, query
+
+        variables = body.get('variables', {})
+        data = {}
+
+        for name, value in variables.items():
+            if not name.startswith('name'):
+                continue
+
+            alias = f"repo{name[len('name'):]}"
+            repository = self.repositories.get(value)
+
+            if repository is None:
+                data[alias] = None
+                continue
+
+            data[alias] = self.graphql_repository(
+                repository,
+                variables,
+                name[len('name'):]
+            )
+
+        return 200, {'data': data}
+
+    def graphql_repository(self, repository, variables, index):
+        '''
+        Resolves the fields asked on a Repository
+        '''
+
+        node = {
+            'defaultBranchRef': {
+                'name': repository.default_branch,
+                'target': {
+                    'oid': repository.branches[repository.default_branch]
+                }
+            }
+        }
+
+        if 'expression' in variables:
+            path = variables['expression'].split(':', 1)[1]
+            files = repository.commits[
+                repository.branches[repository.default_branch]
+            ]['files']
+            node['object'] = {
+                'text': files[path].decode('utf-8')
+            } if path in files else None
+
+        if f"ref{index}" in variables:
+            branch = variables[f"ref{index}"][len('refs/heads/'):]
+            node['incoming'] = {
+                'target': {'oid': repository.branches[branch]},
+                'associatedPullRequests': {
+                    'nodes': [
+                        {'number': number, 'title': pull['title']}
+                        for number, pull in sorted(repository.pulls.items())
+                        if pull['head'] == branch
+                    ][:1]
+                }
+            } if branch in repository.branches else None
+
+        return node
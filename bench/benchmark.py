@@ -0,0 +1,243 @@
+"""
+Benchmark of the Workflow Spreader against a local fake Github API
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from FakeGithub import FakeGithub
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ORGANIZATION = 'bench'
+
+
+class Benchmark:
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self, repositories, density, latency=0, rate_limit=1000000000,
+            seed=0):
+        '''
+        Benchmark Constructor
+        density is the share of Repositories with a Workflow Configuration
+        '''
+
+        self.repositories = repositories
+        self.density = density
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.random = random.Random(seed)
+
+    def get_workflows(self):
+        '''
+        Reads the Workflows of the Spreader, by name
+        '''
+
+        workflows = {}
+        workflows_path = os.path.join(ROOT_PATH, 'workflows')
+
+        for root, _, filenames in os.walk(workflows_path):
+            for filename in filenames:
+                if filename.endswith('.yml'):
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, workflows_path)[:-4]
+
+                    with open(path, 'r', encoding='UTF-8') as file:
+                        workflows[name.replace(os.sep, '/')] = \
+                            file.read().encode('utf-8')
+
+        return workflows
+
+    def build(self):
+        '''
+        Generates the synthetic Organization
+        Subscribed Workflows are up to date, outdated or missing, subscribed
+        Repositories have the workflow-spreader Topic and Custom Property.
+        A few Repositories are archived, forks or empty
+        '''
+
+        fake = FakeGithub(
+            organization=ORGANIZATION,
+            latency=self.latency,
+            rate_limit=self.rate_limit
+        )
+        workflows = self.get_workflows()
+        config_path = os.getenv(
+            'WORKFLOW_CONFIG_PATH',
+            '.github/.workflows.json'
+        )
+
+        for index in range(self.repositories):
+            files = {'README.md': f"# repo-{index}\n".encode('utf-8')}
+            subscribed = []
+
+            if self.random.random() < self.density:
+                subscribed = self.random.sample(
+                    sorted(workflows),
+                    self.random.randint(1, len(workflows))
+                )
+                files[config_path] = json.dumps({
+                    'workflow-autoupdate': True,
+                    'workflows': subscribed
+                }).encode('utf-8')
+
+                for name in subscribed:
+                    destination = \
+                        f".github/workflows/{os.path.basename(name)}.yml"
+                    state = self.random.random()
+
+                    if state < 0.5:
+                        files[destination] = workflows[name]
+
+                    elif state < 0.75:
+                        files[destination] = workflows[name] + b"# old\n"
+
+            repository = fake.add_repository(f"repo-{index:05d}", files)
+
+            if subscribed:
+                repository.topics = ['workflow-spreader']
+                repository.properties = {'workflow-spreader': 'true'}
+
+            kind = self.random.random()
+
+            if kind < 0.05:
+                repository.archived = True
+
+            elif kind < 0.08:
+                repository.fork = True
+
+            elif kind < 0.1:
+                repository.size = 0
+
+        return fake
+
+    def run(self, arguments):
+        '''
+        Runs main.py end to end against the fake API
+        Returns the measures of the run
+        '''
+
+        fake = self.build()
+        url = fake.start()
+        env = dict(
+            os.environ,
+            GITHUB_TOKEN='benchmark',
+            ORGANIZATION_NAME=ORGANIZATION,
+            GITHUB_API_URL=url,
+            GITHUB_GRAPHQL_URL=f"{url}/graphql"
+        )
+
+        with tempfile.TemporaryFile(mode='w+', encoding='UTF-8') as output:
+            start = time.monotonic()
+            process = subprocess.Popen(  # pylint: disable=consider-using-with
+                [sys.executable, 'bin/main.py'] + arguments,
+                cwd=ROOT_PATH,
+                env=env,
+                stdout=output,
+                stderr=subprocess.STDOUT
+            )
+            # wait4 gives the resource usage of this child only
+            _, status, usage = os.wait4(process.pid, 0)
+            wall_time = time.monotonic() - start
+
+            output.seek(0)
+            errors = sum(
+                1 for line in output if line.startswith('::error::')
+            )
+
+        fake.stop()
+
+        return {
+            'repositories': self.repositories,
+            'density': self.density,
+            'latency': self.latency,
+            'exit_code': os.waitstatus_to_exitcode(status),
+            'errors': errors,
+            'wall_time': round(wall_time, 3),
+            # ru_maxrss is in KB on Linux
+            'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),
+            'requests': sum(fake.counts.values()),
+            'requests_by_endpoint': dict(
+                sorted(fake.counts.items(), key=lambda item: -item[1])
+            )
+        }
+
+
+def print_result(result):
+    '''
+    Prints the measures of a run
+    '''
+
+    print(
+        f"\n{result['repositories']} repositories, "
+        f"density {result['density']}, latency {result['latency']}s\n"
+        f"  wall time  {result['wall_time']}s\n"
+        f"  peak RSS   {result['peak_rss_mb']} MB\n"
+        f"  requests   {result['requests']}\n"
+        f"  exit code  {result['exit_code']}, {result['errors']} errors"
+    )
+
+    for endpoint, count in result['requests_by_endpoint'].items():
+        print(f"  {count:>8}  {endpoint}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Benchmarks main.py against a local fake Github API'
+    )
+    parser.add_argument(
+        '--sizes',
+        default='10,1000,20000',
+        help='Comma-separated Organization sizes'
+    )
+    parser.add_argument(
+        '--density',
+        type=float,
+        default=0.3,
+        help='Share of Repositories with a Workflow Configuration'
+    )
+    parser.add_argument(
+        '--latency',
+        type=float,
+        default=0,
+        help='Delay of every API response, in seconds'
+    )
+    parser.add_argument(
+        '--rate-limit',
+        type=int,
+        default=1000000000,
+        help='Requests allowed per hour by the fake API'
+    )
+    parser.add_argument(
+        '--output',
+        help='Writes the results as JSON to this file'
+    )
+    parser.add_argument(
+        'arguments',
+        nargs=argparse.REMAINDER,
+        help='Arguments given to main.py, after --'
+    )
+    args = parser.parse_args()
+
+    results = []
+
+    for size in args.sizes.split(','):
+        result = Benchmark(
+            repositories=int(size),
+            density=args.density,
+            latency=args.latency,
+            rate_limit=args.rate_limit
+        ).run(
+            [argument for argument in args.arguments if argument != '--']
+        )
+        print_result(result)
+        results.append(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='UTF-8') as file:
+            json.dump(results, file, indent=2)
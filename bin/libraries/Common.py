@@ -24,38 +24,14 @@ class Common:
                 f"::{msg_type.lower()}::{msg_type.upper()}: {text}"
             )
 
-    def diff_local_and_repo_files(
-            repository, branch_name, local_file, remote_file):
+    def git_blob_sha(content):
         '''
-        Check if there are differences between a local file and a remote file
-        Returns False if there is no change between files, True otherwise
+        Calculate the git blob SHA of a content, as Github reports it
         '''
 
-        local_hash = Common.hash_file(
-            path=local_file
-        )
-        remote_hash = repository.hash_file(
-            path=remote_file,
-            branch_name=branch_name
-        )
-
-        if local_hash and remote_hash and local_hash == remote_hash:
-            return False
-
-        return True
-
-    def hash_file(path):
-        '''
-        Calculate sha256 hash of a local file
-        '''
-
-        if os.path.isfile(path):
-            with open(path, 'r', encoding='UTF-8') as file:
-                file_content = file.read().encode('utf-8')
-
-                return hashlib.sha256(file_content).hexdigest()
-
-        return False
+        return hashlib.sha1(
+            f"blob {len(content)}\0".encode('utf-8') + content
+        ).hexdigest()
 
     def replace_template_tags(configurations):
         '''
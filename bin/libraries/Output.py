@@ -0,0 +1,84 @@
+"""
+Output Class, keeps parallel outputs readable
+"""
+
+import io
+import sys
+import threading
+from contextlib import contextmanager
+
+
+class Output(io.TextIOBase):
+    '''
+    Stdout proxy that buffers what a worker thread prints, so that the
+    output of a Repository is printed in one block once it is processed
+    '''
+
+    def __init__(self, stream):
+        '''
+        Output Constructor
+        '''
+
+        super().__init__()
+
+        self.stream = stream
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def install():
+        '''
+        Replaces sys.stdout by an Output proxy, only once
+        '''
+
+        if not isinstance(sys.stdout, Output):
+            sys.stdout = Output(sys.stdout)
+
+        return sys.stdout
+
+    def writable(self):
+        '''
+        Tells that the Output accepts writes, like a text stream
+        '''
+
+        return True
+
+    def write(self, text):
+        '''
+        Writes to the current thread buffer if any, to the stream otherwise
+        '''
+
+        buffer = getattr(self.local, 'buffer', None)
+
+        if buffer is not None:
+            return buffer.write(text)
+
+        with self.lock:
+            return self.stream.write(text)
+
+    def flush(self):
+        '''
+        Flushes the stream, buffered output is flushed with its block
+        '''
+
+        if getattr(self.local, 'buffer', None) is None:
+            with self.lock:
+                self.stream.flush()
+
+    @contextmanager
+    def buffered(self):
+        '''
+        Buffers everything printed by the current thread in the context
+        '''
+
+        self.local.buffer = io.StringIO()
+
+        try:
+            yield
+
+        finally:
+            text = self.local.buffer.getvalue()
+            self.local.buffer = None
+
+            with self.lock:
+                self.stream.write(text)
+                self.stream.flush()
@@ -0,0 +1,431 @@
+"""
+Asynchronous Github Transport for the Workflow Spreader
+"""
+
+import asyncio
+import base64
+import importlib.util
+import json
+import os
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+
+from .GraphQL import GraphQL
+from .HttpCache import HttpCache
+from .Metrics import Metrics
+from .RateLimiter import RateLimiter
+
+try:
+    import httpx
+
+except ImportError:
+    httpx = None
+
+
+class AsyncTransport:
+    '''
+    Sends the independent reads of many Repositories as concurrent asyncio
+    tasks, under a global semaphore, and fills the Repository caches with
+    them before the Repositories are processed.
+
+    With httpx installed, requests share a pooled HTTP/2 connection, HTTP/2
+    needing the h2 package. Otherwise they are sent by a thread pool through
+    a pooled requests Session.
+    '''
+
+    transport = os.getenv('SPREADER_TRANSPORT', 'sync')
+    concurrency = int(os.getenv('SPREADER_ASYNC_CONCURRENCY', '20'))
+    # Configurations prefetched together
+    batch_size = int(os.getenv('SPREADER_ASYNC_BATCH_SIZE', '100'))
+    timeout = 30
+    instance = None
+    instance_lock = threading.Lock()
+
+    def __init__(self, token, concurrency):
+        '''
+        AsyncTransport Constructor
+        The event loop runs in its own thread for the whole run, so that its
+        connections are reused from one batch to the next
+        '''
+
+        self.headers = {
+            'Authorization': f"token {token}",
+            'Accept': 'application/vnd.github.v3+json',
+            'User-Agent': 'workflow-spreader'
+        }
+        self.concurrency = max(1, concurrency)
+        self.semaphore = None
+        self.client = None
+        self.session = None
+        self.executor = None
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever,
+            daemon=True
+        )
+        self.thread.start()
+        self.run(self.open())
+
+    def get_instance():
+        '''
+        Returns the run AsyncTransport, None if the sync transport is used
+        '''
+
+        with AsyncTransport.instance_lock:
+            if AsyncTransport.instance is None \
+               and AsyncTransport.transport == 'async':
+                AsyncTransport.instance = AsyncTransport(
+                    token=os.getenv('GITHUB_TOKEN'),
+                    concurrency=AsyncTransport.concurrency
+                )
+
+            return AsyncTransport.instance
+
+    def run(self, coroutine):
+        '''
+        Runs a coroutine on the event loop and returns its result
+        '''
+
+        return asyncio.run_coroutine_threadsafe(
+            coroutine,
+            self.loop
+        ).result()
+
+    async def open(self):
+        '''
+        Creates the connection pool, from the event loop
+        '''
+
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+
+        if httpx is not None:
+            self.client = httpx.AsyncClient(
+                http2=importlib.util.find_spec('h2') is not None,
+                limits=httpx.Limits(max_connections=self.concurrency),
+                timeout=AsyncTransport.timeout
+            )
+
+        else:
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=self.concurrency,
+                pool_maxsize=self.concurrency
+            )
+
+            self.session = requests.Session()
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.concurrency
+            )
+
+    async def send(self, url, headers):
+        '''
+        Sends a GET request, returns the response
+        '''
+
+        if self.client is not None:
+            return await self.client.get(url, headers=headers)
+
+        return await self.loop.run_in_executor(
+            self.executor,
+            partial(
+                self.session.get,
+                url,
+                headers=headers,
+                timeout=AsyncTransport.timeout,
+                allow_redirects=False
+            )
+        )
+
+    async def get(self, url, repository_name, phase):
+        '''
+        Reads a Github API URL through the RateLimiter and the HttpCache
+        Every attempt is recorded by the Metrics, timed without the waits
+        Returns the status and the text of the response
+        '''
+
+        headers = dict(self.headers)
+        cache = HttpCache.get_instance()
+        cache_key = None
+        entry = None
+
+        if cache is not None:
+            cache_key = HttpCache.get_key(url, headers)
+            entry = cache.get(cache_key)
+
+            if entry is not None:
+                headers.update(HttpCache.get_conditional_headers(entry))
+
+        limiter = RateLimiter.get_instance()
+        path = urllib.parse.urlsplit(url).path
+
+        async with self.semaphore:
+            for attempt in range(limiter.max_retries + 1):
+                await asyncio.sleep(max(0, limiter.get_delay('GET', url)))
+
+                start = time.monotonic()
+                response = await self.send(url, headers)
+
+                with Metrics.tag(repository=repository_name, phase=phase):
+                    Metrics.get_instance().record(
+                        verb='GET',
+                        url=path,
+                        status=response.status_code,
+                        latency=time.monotonic() - start,
+                        size=len(response.content),
+                        headers=response.headers
+                    )
+
+                if not limiter.after_response(
+                    status=response.status_code,
+                    headers=response.headers,
+                    text=response.text,
+                    url=url
+                ) or attempt == limiter.max_retries:
+                    break
+
+        if entry is not None and response.status_code == 304:
+            return 200, entry['text']
+
+        if cache is not None and response.status_code == 200 \
+           and HttpCache.is_cacheable(response.headers):
+            cache.set(cache_key, response.headers, response.text)
+
+        return response.status_code, response.text
+
+    async def get_json(self, url, repository_name, phase):
+        '''
+        Reads a Github API URL
+        Returns the decoded JSON, None if not found
+        '''
+
+        status, text = await self.get(url, repository_name, phase)
+
+        if status == 404:
+            return None
+
+        if status != 200:
+            raise requests.HTTPError(f"{status} on {url}")
+
+        return json.loads(text)
+
+    async def get_branch_head(self, repository, branch_name):
+        '''
+        Returns the head commit SHA of a Branch, False if it does not exist
+        '''
+
+        branch = await self.get_json(
+            f"{repository.get_api_url()}/branches/"
+            f"{urllib.parse.quote(branch_name)}",
+            repository.get_name(),
+            'diff'
+        )
+
+        return branch['commit']['sha'] if branch else False
+
+    async def get_directory_blob_shas(self, repository, path, branch_name):
+        '''
+        Lists a directory on a Branch
+        Returns the blob SHA of each file by path
+        '''
+
+        contents = await self.get_json(
+            f"{repository.get_api_url()}/contents/"
+            f"{urllib.parse.quote(path)}"
+            f"?ref={urllib.parse.quote(branch_name, safe='')}",
+            repository.get_name(),
+            'diff'
+        )
+
+        if contents is None:
+            return {}
+
+        if not isinstance(contents, list):
+            contents = [contents]
+
+        return {
+            content['path']: content['sha']
+            for content in contents
+            if content['type'] == 'file'
+        }
+
+    async def get_file(self, repository, path):
+        '''
+        Reads a file on the default Branch
+        Returns its text, None if it does not exist
+        '''
+
+        content = await self.get_json(
+            f"{repository.get_api_url()}/contents/"
+            f"{urllib.parse.quote(path)}",
+            repository.get_name(),
+            'discovery'
+        )
+
+        if content is None:
+            return None
+
+        # Large files have no inline content
+        if content.get('encoding') != 'base64':
+            raise ValueError(f"{path} has no inline content")
+
+        return base64.b64decode(content['content']).decode('UTF-8')
+
+    async def gather(self, coroutines):
+        '''
+        Runs coroutines as concurrent tasks
+        Returns their results, exceptions included
+        '''
+
+        return await asyncio.gather(*coroutines, return_exceptions=True)
+
+    def get_files(self, repositories, path):
+        '''
+        Reads a file on the default Branch of many Repositories
+        Returns the text of the file, None if it does not exist, by
+        Repository name. Repositories that could not be read are left out
+        '''
+
+        results = self.run(self.gather([
+            self.get_file(repository, path) for repository in repositories
+        ]))
+
+        return {
+            repository.get_name(): result
+            for repository, result in zip(repositories, results)
+            if not isinstance(result, Exception)
+        }
+
+    async def prefetch_repository(
+            self, repository, branch_name, workflows, state_store=None):
+        '''
+        Fills the Repository caches with what the diff of its Workflows
+        reads: the incoming Branch head, the checked Branch head if the
+        StateStore or a Workflow to write needs it, and the listing of the
+        Workflow directories on the checked Branch. Workflows the
+        StateStore knows up to date are not listed
+        '''
+
+        if not repository.has_branch_head(branch_name):
+            repository.set_branch_head(
+                branch_name,
+                await self.get_branch_head(repository, branch_name)
+            )
+
+        check_branch = branch_name \
+            if repository.get_branch_head(branch_name) \
+            else repository.get_default_branch()
+
+        if state_store is not None:
+            if not repository.has_branch_head(check_branch):
+                repository.set_branch_head(
+                    check_branch,
+                    await self.get_branch_head(repository, check_branch)
+                )
+
+            workflows = [
+                workflow for workflow in workflows
+                if not state_store.is_up_to_date(
+                    repository=repository.get_full_name(),
+                    workflow=workflow.name,
+                    branch=check_branch,
+                    blob_sha=workflow.blob_sha,
+                    head_sha=repository.get_branch_head(check_branch)
+                )
+            ]
+
+        for path in sorted({
+            os.path.dirname(workflow.destination) for workflow in workflows
+        }):
+            if not repository.has_directory_blob_shas(path, check_branch):
+                repository.set_directory_blob_shas(
+                    path,
+                    check_branch,
+                    await self.get_directory_blob_shas(
+                        repository,
+                        path,
+                        check_branch
+                    )
+                )
+
+        if not repository.has_branch_head(check_branch) and any(
+            repository.get_file_blob_sha(
+                path=workflow.destination,
+                branch_name=check_branch
+            ) != workflow.blob_sha
+            for workflow in workflows
+        ):
+            repository.set_branch_head(
+                check_branch,
+                await self.get_branch_head(repository, check_branch)
+            )
+
+    def prefetch(
+            self, organization, catalog, configurations, state_store=None):
+        '''
+        Prefetches the reads of the diff for a batch of Configurations at a
+        time, concurrently, skipping what the StateStore knows up to date
+        Yields the Configurations once their batch is prefetched. Failed
+        reads are left to the Propagator, which reports them
+        '''
+
+        for configs in GraphQL.batches(
+            configurations,
+            AsyncTransport.batch_size
+        ):
+            coroutines = []
+
+            for config in configs:
+                # The Propagator reports Configurations without Branch
+                if config.get_branch_name() is None:
+                    continue
+
+                try:
+                    repository = organization.get_repo(config.repository_name)
+
+                except Exception:  # pylint: disable=broad-except
+                    continue
+
+                coroutines.append(self.prefetch_repository(
+                    repository=repository,
+                    branch_name=config.get_branch_name(),
+                    workflows=[
+                        workflow for workflow in (
+                            catalog.get(name, config.data.get('variables'))
+                            for name in config.data['workflows']
+                        )
+                        if workflow is not None
+                    ],
+                    state_store=state_store
+                ))
+
+            self.run(self.gather(coroutines))
+
+            yield from configs
+
+    async def aclose(self):
+        '''
+        Closes the connection pool, from the event loop
+        '''
+
+        if self.client is not None:
+            await self.client.aclose()
+
+        if self.session is not None:
+            self.session.close()
+            self.executor.shutdown()
+
+    def close(self):
+        '''
+        Closes the connection pool and stops the event loop
+        '''
+
+        self.run(self.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
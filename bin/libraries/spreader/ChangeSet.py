@@ -0,0 +1,111 @@
+"""
+Changes of the Spreader Repository since a base commit
+"""
+
+import copy
+import subprocess
+
+from ..Common import Common
+from .Configuration import Configuration
+from .WorkflowCatalog import WorkflowCatalog
+
+
+class ChangeSet:
+
+    def __init__(self, workflows, repositories):
+        '''
+        ChangeSet Constructor
+        workflows are the changed Workflow names, repositories the names of
+        the Repositories whose local Configuration changed
+        '''
+
+        self.workflows = set(workflows)
+        self.repositories = {name.lower() for name in repositories}
+
+    def from_git(base, head='HEAD'):
+        '''
+        Computes the ChangeSet between two commits
+        Returns None when a full sweep is needed
+        '''
+
+        if not base or set(base) == {'0'}:
+            return None
+
+        workflows_path = WorkflowCatalog.workflows_path \
+            .replace('./', '', 1).rstrip('/')
+        config_path = Configuration.config_path \
+            .replace('./', '', 1).rstrip('/')
+        default_config_path = \
+            f"{config_path}/{Configuration.default_config_filename}"
+
+        try:
+            changes = subprocess.run(
+                [
+                    'git', 'diff', '--name-only', base, head, '--',
+                    workflows_path, config_path
+                ],
+                capture_output=True,
+                check=True,
+                text=True
+            ).stdout.splitlines()
+
+        except (OSError, subprocess.CalledProcessError) as ex:
+            Common.github_output(
+                'warning',
+                f"Could not compute changes since {base}, "
+                f"falling back to a full sweep: {str(ex)}"
+            )
+
+            return None
+
+        workflows = []
+        repositories = []
+
+        for change in changes:
+            if change.startswith(f"{workflows_path}/") \
+               and change.endswith('.yml'):
+                workflows.append(
+                    change[len(workflows_path) + 1:-len('.yml')]
+                )
+
+            elif change == default_config_path:
+                # Default values may apply to every Repository
+                return None
+
+            elif change.startswith(f"{config_path}/") \
+                    and change.endswith('.json'):
+                repositories.append(
+                    change[len(config_path) + 1:-len('.json')]
+                )
+
+        return ChangeSet(
+            workflows=workflows,
+            repositories=repositories
+        )
+
+    def filter_configurations(self, configurations):
+        '''
+        Restricts the Configurations to the changed Workflows. Repositories
+        with a changed local Configuration keep all their Workflows
+        Yields the Configurations left, as they come
+        '''
+
+        for config in configurations:
+            if config.repository_type == 'local' \
+               and config.repository_name.lower() in self.repositories:
+                yield config
+                continue
+
+            workflows = [
+                workflow for workflow in config.data['workflows']
+                if workflow in self.workflows
+            ]
+
+            if workflows:
+                filtered_config = copy.copy(config)
+                filtered_config.data = dict(
+                    config.data,
+                    workflows=workflows
+                )
+
+                yield filtered_config
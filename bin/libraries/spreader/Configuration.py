@@ -2,14 +2,19 @@
 Wrapper Class for the Workflow Spreader
 """
 
+import copy
 import os
 from json import JSONDecodeError, loads
 from pathlib import Path
 
-from jsonschema import ValidationError, validate
+from github import GithubException
+from jsonschema.validators import validator_for
 
 from ..Colors import Colors
 from ..Common import Common
+from .AsyncTransport import AsyncTransport
+from .GraphQL import GraphQL
+from .Metrics import Metrics
 
 
 class Configuration:
@@ -19,6 +24,14 @@ class Configuration:
         'WORKFLOW_CONFIG_PATH',
         '.github/.workflows.json'
     )
+    discovery_backend = os.getenv('SPREADER_DISCOVERY_BACKEND', 'graphql')
+    discovery_strategy = os.getenv('SPREADER_DISCOVERY_STRATEGY', 'full')
+    discovery_topic = os.getenv(
+        'SPREADER_DISCOVERY_TOPIC',
+        'workflow-spreader'
+    )
+    # Custom Property selecting the Repositories, as name=value
+    discovery_property = os.getenv('SPREADER_DISCOVERY_PROPERTY', '')
     config_validation_schema = {
         "type": "object",
         "properties": {
@@ -49,9 +62,19 @@ class Configuration:
             },
             "workflows": {
                 "type": "array"
+            },
+            "variables": {
+                "type": "object",
+                "additionalProperties": {
+                    "type": "string"
+                }
             }
         }
     }
+    # Parsed and compiled once per run
+    default_configuration = None
+    default_configuration_loaded = False
+    validator = None
 
     def __init__(self, repository_name, repository_type, path, data):
         '''
@@ -65,7 +88,7 @@ class Configuration:
             config_data=data
         )
 
-    def load_default_configuration(self):
+    def load_default_configuration():
         '''
         Loads default configuration
         '''
@@ -90,18 +113,53 @@ class Configuration:
 
         return None
 
+    def get_default_configuration():
+        '''
+        Returns the default configuration, loaded on first use
+        '''
+
+        if not Configuration.default_configuration_loaded:
+            Configuration.default_configuration = \
+                Configuration.load_default_configuration()
+            Configuration.default_configuration_loaded = True
+
+        return Configuration.default_configuration
+
+    def get_validator():
+        '''
+        Returns the validator of config_validation_schema, compiled on first
+        use
+        '''
+
+        if Configuration.validator is None:
+            validator_class = validator_for(
+                Configuration.config_validation_schema
+            )
+            validator_class.check_schema(
+                Configuration.config_validation_schema
+            )
+            Configuration.validator = validator_class(
+                Configuration.config_validation_schema
+            )
+
+        return Configuration.validator
+
     def upsert_default_configuration(self, config_data):
         '''
         Upsert Repository Configuration if missing Configuration Datas
         '''
 
-        default_config = self.load_default_configuration()
+        default_config = Configuration.get_default_configuration()
         upserted_config = config_data
 
         # If there is no default config, return the original config datas
-        if not config_data or 'incoming-changes' not in default_config:
+        if not config_data or not default_config \
+           or 'incoming-changes' not in default_config:
             return config_data
 
+        # Configurations must not share the default values
+        default_config = copy.deepcopy(default_config)
+
         # first case : Repo config file omits all the incoming-changes config
         if 'incoming-changes' not in config_data:
             Common.github_output(
@@ -157,58 +215,351 @@ class Configuration:
 
         return upserted_config
 
+    def get_branch_name(self):
+        '''
+        Returns the incoming Branch name, None if neither the Configuration
+        nor the default one sets it
+        '''
+
+        return (self.data.get('incoming-changes') or {}).get('branch-name')
+
+    def get_schema_errors(self):
+        '''
+        Returns every JSON Schema violation of the Configuration
+        '''
+
+        errors = sorted(
+            Configuration.get_validator().iter_errors(self.data),
+            key=lambda error: list(map(str, error.absolute_path))
+        )
+
+        return [
+            f"{'.'.join(map(str, error.absolute_path)) or '(root)'}: "
+            f"{error.message}"
+            for error in errors
+        ]
+
     def validate_configuration_schema(self):
         '''
         Validate the integrity of a JSON Workflow Configuration
         '''
 
+        return not self.get_schema_errors()
+
+    def validate_configurations(configurations):
+        '''
+        Validates a batch of Configurations, reporting every error of each
+        invalid file
+        Returns the valid Configurations
+        '''
+
+        valid_configurations = []
+
+        for config in configurations:
+            errors = config.get_schema_errors()
+
+            if not errors:
+                valid_configurations.append(config)
+                continue
+
+            location = config.path if config.repository_type == 'local' \
+                else f"{config.repository_name}/{config.path}"
+
+            for error in errors:
+                Common.github_output(
+                    "error",
+                    f"Workflow Configuration {location} "
+                    f"does not respect the JSON Scheme. {error}"
+                )
+
+        return valid_configurations
+
+    def parse_remote_configuration(repository_name, content):
+        '''
+        Builds a Configuration from the text of a Remote Configuration file
+        '''
+
         try:
-            validate(
-                instance=self.data,
-                schema=Configuration.config_validation_schema
+            # Read Auto-Update Configuration
+            data = loads(content)
+
+        except TypeError:
+            data = {}
+
+        except JSONDecodeError:
+            data = {}
+
+        return Configuration(
+            repository_name=repository_name,
+            repository_type="remote",
+            path=Configuration.remote_config_path,
+            data=data
+        )
+
+    def get_discovered_repositories(organization, repository_names):
+        '''
+        Retrieve the Organization Repositories to inspect with the discovery
+        strategy : every Repository (full), those with a Topic (topic), those
+        with a Custom Property value (property), or only those with a Local
+        Configuration (local)
+        Repositories named in repository_names are always inspected
+        '''
+
+        strategy = Configuration.discovery_strategy
+        local_names = {name.lower() for name in repository_names}
+
+        if strategy == 'full':
+            return organization.get_repos()
+
+        if strategy == 'local':
+            return organization.get_named_repos(repository_names)
+
+        if strategy == 'topic':
+            topic = Configuration.discovery_topic
+
+            return organization.get_repos(
+                predicate=lambda repository: (
+                    repository.get_name().lower() in local_names
+                    or topic in repository.get_topics()
+                )
             )
 
-            return True
+        if strategy == 'property':
+            property_name, separator, property_value = \
+                Configuration.discovery_property.partition('=')
+
+            if not separator or not property_name.strip() \
+               or not property_value.strip():
+                raise ValueError(
+                    "Discovery property must be set as name=value, got "
+                    f"'{Configuration.discovery_property}'"
+                )
 
-        except ValidationError:
-            return False
+            property_name = property_name.strip()
+            property_value = property_value.strip()
+            values = organization.get_property_values(property_name)
 
-    def get_remote_configurations(organization):
+            def has_property_value(repository):
+                '''
+                Checks if a Repository has the discovery property value
+                '''
+
+                value = values.get(repository.get_name().lower())
+
+                # Multi select properties have a list of values
+                return value == property_value or (
+                    isinstance(value, list) and property_value in value
+                )
+
+            return organization.get_repos(
+                predicate=lambda repository: (
+                    repository.get_name().lower() in local_names
+                    or has_property_value(repository)
+                )
+            )
+
+        raise ValueError(f"Unknown discovery strategy {strategy}")
+
+    def get_remote_configurations(
+            organization, repositories, state_store=None):
         '''
         Retrieve Configurations from Organization Repositories
+        Yields a batch of Repositories at a time, as a list of Repository
+        name and Configuration, None when the Repository has none
+        With a StateStore, the Configuration files of Repositories not pushed
+        since the last run are not read again
         '''
 
-        configurations = []
+        graphql = organization.get_graphql() \
+            if Configuration.discovery_backend == 'graphql' else None
+
+        for repos in GraphQL.batches(repositories):
+            contents = {}
+            missing_repos = []
+
+            for repo in repos:
+                pushed_at = repo.get_metadata().get('pushed_at')
+                discovery = state_store.get_discovery(
+                    repository=repo.get_full_name(),
+                    path=Configuration.remote_config_path,
+                    pushed_at=pushed_at
+                ) if state_store and pushed_at else None
+
+                if discovery is None:
+                    missing_repos.append(repo)
+                    continue
+
+                contents[repo.get_name()] = discovery['content']
+
+                # Without a push, the default Branch did not move either
+                if discovery['head_sha']:
+                    repo.set_branch_head(
+                        repo.get_default_branch(),
+                        discovery['head_sha']
+                    )
+
+            if missing_repos:
+                if graphql:
+                    try:
+                        files = Configuration.fetch_graphql_configurations(
+                            organization=organization,
+                            graphql=graphql,
+                            repos=missing_repos
+                        )
+
+                    except GithubException as ex:
+                        Common.github_output(
+                            'warning',
+                            "Could not discover the Configurations of "
+                            f"{len(missing_repos)} Repositories with "
+                            f"GraphQL, falling back to REST: {str(ex)}"
+                        )
+
+                        files = Configuration.fetch_rest_configurations(
+                            repos=missing_repos
+                        )
+
+                else:
+                    files = Configuration.fetch_rest_configurations(
+                        repos=missing_repos
+                    )
+
+                for repo in missing_repos:
+                    content, head_sha = files[repo.get_name()]
+                    contents[repo.get_name()] = content
+
+                    if head_sha:
+                        repo.set_branch_head(
+                            repo.get_default_branch(),
+                            head_sha
+                        )
+
+                    pushed_at = repo.get_metadata().get('pushed_at')
+
+                    if state_store and pushed_at:
+                        state_store.set_discovery(
+                            repository=repo.get_full_name(),
+                            path=Configuration.remote_config_path,
+                            pushed_at=pushed_at,
+                            head_sha=head_sha,
+                            content=content
+                        )
+
+            yield [
+                (
+                    repo.get_name(),
+                    Configuration.parse_remote_configuration(
+                        repository_name=repo.get_name(),
+                        content=contents[repo.get_name()]
+                    ) if contents[repo.get_name()] is not None else None
+                )
+                for repo in repos
+            ]
+
+    def fetch_rest_configurations(repos):
+        '''
+        Reads the Configuration files of Repositories, one request each,
+        sent concurrently by the AsyncTransport if enabled
+        Returns the file content, None if absent, and the default Branch head,
+        unknown here, by Repository name
+        '''
+
+        files = {}
+        transport = AsyncTransport.get_instance()
+
+        if transport is not None:
+            files = {
+                repository_name: (content, None)
+                for repository_name, content in transport.get_files(
+                    repos,
+                    Configuration.remote_config_path
+                ).items()
+            }
+
+        for repo in repos:
+            if repo.get_name() in files:
+                continue
 
-        for repo in organization.get_repos():
             config = repo.get_file(
                 path=Configuration.remote_config_path
             )
 
-            if config:
-                try:
-                    # Read Auto-Update Configuration
-                    data = loads(
-                        config
-                        .decoded_content.decode('UTF-8')
-                    )
+            files[repo.get_name()] = (
+                config.decoded_content.decode('UTF-8') if config else None,
+                None
+            )
 
-                except TypeError:
-                    data = {}
+        return files
 
-                except JSONDecodeError:
-                    data = {}
+    def fetch_graphql_configurations(organization, graphql, repos):
+        '''
+        Reads the Configuration files and default Branch heads of a batch of
+        Repositories in a single GraphQL query
+        Returns the file content, None if absent, and the default Branch head
+        by Repository name
+        '''
 
-                configurations.append(
-                    Configuration(
-                        repository_name=repo.get_name(),
-                        repository_type="remote",
-                        path=Configuration.remote_config_path,
-                        data=data
-                    )
+        variables = {
+            'owner': organization.get_name(),
+            'expression': f"HEAD:{Configuration.remote_config_path}"
+        }
+        fields = []
+
+        for index, repo in enumerate(repos):
+            variables[f"name{index}"] = repo.get_name()
+            fields.append(
+                f"repo{index}: repository(owner: $owner, "
+                f"name: $name{index}) {{ object(expression: $expression)"
+                " { ... on Blob { text } }"
+                " defaultBranchRef { target { oid } } }"
+            )
+
+        arguments = ', '.join(
+            f"$name{index}: String!" for index in range(len(repos))
+        )
+        data = graphql.query(
+            f"query($owner: String!, $expression: String!, {arguments})"
+            f" {{ {' '.join(fields)} }}",
+            variables
+        )
+
+        files = {}
+        failed_repos = []
+
+        for index, repo in enumerate(repos):
+            node = data.get(f"repo{index}")
+            head_sha = None
+
+            # Nodes in error are read with the REST API
+            if not node:
+                failed_repos.append(repo)
+                continue
+
+            if node.get('defaultBranchRef'):
+                head_sha = node['defaultBranchRef']['target']['oid']
+
+            if not node['object']:
+                files[repo.get_name()] = (None, head_sha)
+                continue
+
+            content = node['object'].get('text')
+
+            # Binary or truncated blobs have no text, use the REST API
+            if content is None:
+                config = repo.get_file(
+                    path=Configuration.remote_config_path
                 )
+                content = config.decoded_content.decode('UTF-8') \
+                    if config else None
 
-        return configurations
+            files[repo.get_name()] = (content, head_sha)
+
+        if failed_repos:
+            files.update(
+                Configuration.fetch_rest_configurations(repos=failed_repos)
+            )
+
+        return files
 
     def get_local_configurations():
         '''
@@ -250,54 +601,43 @@ class Configuration:
         '''
         Finds configurations stored in this repo. Will be overridden by remote
         configurations if we found any
+        Returns the valid Configurations by lowercased Repository name
         '''
 
         configurations = {}
+        activated = 0
 
         print(
             f"{Colors.BOLD}Inspecting Local Workflow Configurations ..."
             f"{Colors.ENDC}"
         )
 
-        for config in Configuration.get_local_configurations():
-
-            if not organization.repo_exists(config.repository_name):
-                Common.github_output(
-                    "warning",
-                    "Local Workflow Configuration exists for Repository "
-                    f"{organization.get_name()}/{config.repository_name} "
-                    f"but Repository not found"
+        for config in Configuration.validate_configurations([
+            config for config in Configuration.get_local_configurations()
+            if organization.in_shard(config.repository_name)
+        ]):
+            if 'workflow-autoupdate' in config.data:
+                print(
+                    f" » Repository {Colors.OKCYAN}"
+                    f"{config.repository_name}{Colors.ENDC} has"
+                    " activated Workflow Auto-Update ...\n"
+                    f"   Workflows : {Colors.OKGREEN}"
+                    f"{', '.join(config.data['workflows'])}"
+                    f"{Colors.ENDC}"
                 )
 
-            else:
-                if not config.validate_configuration_schema():
-                    Common.github_output(
-                        "error",
-                        f"Workflow Configuration {config.path} "
-                        "does not respect the JSON Scheme."
-                    )
-
-                else:
-                    if 'workflow-autoupdate' in config.data:
-                        print(
-                            f" » Repository {Colors.OKCYAN}"
-                            f"{config.repository_name}{Colors.ENDC} has"
-                            " activated Workflow Auto-Update ...\n"
-                            f"   Workflows : {Colors.OKGREEN}"
-                            f"{', '.join(config.data['workflows'])}"
-                            f"{Colors.ENDC}"
-                        )
+                activated += 1
 
-                        configurations[config.repository_name] = config
+            else:
+                print(
+                    f" » Repository {Colors.OKCYAN}"
+                    f"{config.repository_name}{Colors.ENDC} has"
+                    " disabled Workflow Auto-Update ..."
+                )
 
-                    else:
-                        print(
-                            f" » Repository {Colors.OKCYAN}"
-                            f"{config.repository_name}{Colors.ENDC} has"
-                            " disabled Workflow Auto-Update ..."
-                        )
+            configurations[config.repository_name.lower()] = config
 
-        if len(configurations) == 0:
+        if activated == 0:
             print(
                 f" » {Colors.FAIL}No Local Workflow Configuration found"
                 f"{Colors.ENDC}"
@@ -305,72 +645,104 @@ class Configuration:
 
         return configurations
 
-    def find_github_configurations(organization):
+    def find_configurations(
+            organization, state_store=None, repository_names=None):
         '''
-        Get Organization Repositories that have activated Workflow Autoupdate
-        Organization Name is provided by Environment Variable _ORGANIZATION
+        Locates Configurations in Local and Remote Repositories
+        Configurations are yielded while the Organization is scanned, the
+        Repository Configuration taking precedence over the Local one
+        repository_names restricts the scan to these Repositories
         '''
 
-        configurations = {}
+        with Metrics.tag(phase='discovery'):
+            local_configs = Configuration \
+                .find_local_configurations(organization)
+            found = 0
 
-        print(
-            f"\n{Colors.BOLD}Inspecting {organization.get_name()}"
-            f" Organization Repositories ...{Colors.ENDC}"
-        )
+            if repository_names is not None:
+                names = {name.lower() for name in repository_names}
+                local_configs = {
+                    name: config for name, config in local_configs.items()
+                    if name in names
+                }
 
-        for config in Configuration.get_remote_configurations(organization):
+            print(
+                f"\n{Colors.BOLD}Inspecting {organization.get_name()}"
+                f" Organization Repositories ...{Colors.ENDC}"
+            )
 
-            if not config.validate_configuration_schema():
-                Common.github_output(
-                    "error",
-                    f"Workflow Configuration {config.path} invalid."
-                )
+            if repository_names is not None:
+                repositories = organization.get_named_repos(repository_names)
 
             else:
-                if 'workflow-autoupdate' in config.data:
-                    print(
-                        f" » Repository {Colors.OKCYAN}"
-                        f"{config.repository_name}{Colors.ENDC} "
-                        "has activated Workflow Auto-Update ...\n"
-                        f"   Workflows : {Colors.OKGREEN}"
-                        f"{', '.join(config.data['workflows'])}{Colors.ENDC}"
+                repositories = Configuration.get_discovered_repositories(
+                    organization,
+                    [
+                        config.repository_name
+                        for config in local_configs.values()
+                    ]
+                )
+
+            for batch in Configuration.get_remote_configurations(
+                organization,
+                repositories,
+                state_store=state_store
+            ):
+                github_configs = {
+                    config.repository_name: config
+                    for config in Configuration.validate_configurations(
+                        [config for _, config in batch if config]
+                    )
+                    if 'workflow-autoupdate' in config.data
+                }
+
+                for repository_name, _ in batch:
+                    local_config = local_configs.pop(
+                        repository_name.lower(),
+                        None
                     )
+                    config = github_configs.get(repository_name)
 
-                    configurations[config.repository_name] = config
+                    if config is not None:
+                        print(
+                            f" » Repository {Colors.OKCYAN}"
+                            f"{config.repository_name}{Colors.ENDC} "
+                            "has activated Workflow Auto-Update ...\n"
+                            f"   Workflows : {Colors.OKGREEN}"
+                            f"{', '.join(config.data['workflows'])}"
+                            f"{Colors.ENDC}"
+                        )
 
-        if len(configurations) == 0:
-            print(
-                f" » {Colors.FAIL}No Repository with Workflow "
-                f"Auto-Update found{Colors.ENDC}"
-            )
+                        if local_config is not None:
+                            Common.github_output(
+                                "warning",
+                                "Local Workflow Configuration for "
+                                f"{repository_name} will be overriden by "
+                                "Repository Configuration"
+                            )
 
-        return configurations
+                    elif local_config is not None \
+                            and 'workflow-autoupdate' in local_config.data:
+                        config = local_config
 
-    def find_configurations(organization):
-        '''
-        Locates Configurations in Local and Remote Repositories
-        '''
+                    else:
+                        continue
 
-        local_configs = Configuration \
-            .find_local_configurations(organization)
-        github_configs = Configuration \
-            .find_github_configurations(organization)
+                    found += 1
 
-        configurations = []
+                    yield config
 
-        for repository_name, github_config in github_configs.items():
-            if repository_name in local_configs:
+            # Local Configurations left were not found in the Organization
+            for config in local_configs.values():
                 Common.github_output(
                     "warning",
-                    f"Local Workflow Configuration for {repository_name}"
-                    " will be overriden by Repository Configuration"
+                    "Local Workflow Configuration exists for Repository "
+                    f"{organization.get_name()}/{config.repository_name} "
+                    f"but Repository not found or skipped"
                 )
 
-            else:
-                configurations.append(github_config)
-
-        for repository_name, local_config in local_configs.items():
-            if repository_name not in configurations:
-                configurations.append(local_config)
-
-        return configurations
+            if found == 0:
+                print(
+                    f" » {Colors.FAIL}No Repository with Workflow "
+                    f"Auto-Update found{Colors.ENDC}"
+                )
@@ -0,0 +1,224 @@
+"""
+Thread-safe HTTP Connection for the Workflow Spreader
+"""
+
+import os
+import threading
+import time
+
+import requests
+from github.Requester import Requester
+
+from .HttpCache import HttpCache
+from .Metrics import Metrics
+from .RateLimiter import RateLimiter
+
+
+class Response:  # pylint: disable=too-few-public-methods
+    '''
+    Mimics the httplib response object expected by PyGithub
+    '''
+
+    def __init__(self, status, headers, text):
+        '''
+        Response Constructor
+        '''
+
+        self.status = status
+        self.headers = headers
+        self.text = text
+
+    def getheaders(self):
+        '''
+        Returns the response headers as (name, value) pairs
+        '''
+
+        return self.headers.items()
+
+    def read(self):
+        '''
+        Returns the response body
+        '''
+
+        return self.text
+
+
+class Connection:
+    '''
+    Mimics the httplib connection object expected by PyGithub.
+
+    PyGithub keeps one connection object per Requester and stores the pending
+    request on it, which is not safe when Repositories are processed by
+    several threads. Once installed, a Connection is built for every request
+    while the requests Session, and its connection pool, is shared.
+    '''
+
+    protocol = 'https'
+    default_port = 443
+    pool_size = int(os.getenv('SPREADER_CONCURRENCY', '4'))
+    session = None
+    session_lock = threading.Lock()
+
+    def __init__(  # pylint: disable=too-many-arguments
+            self, host, port=None, strict=False, timeout=None, retry=None,
+            pool_size=None, **kwargs):
+        '''
+        Connection Constructor
+        '''
+
+        del strict, pool_size
+
+        self.host = host
+        self.port = port if port else self.default_port
+        self.timeout = timeout
+        self.retry = retry
+        self.verify = kwargs.get('verify', True)
+        self.verb = None
+        self.url = None
+        self.body = None
+        self.headers = None
+
+    def install():
+        '''
+        Makes PyGithub use the thread-safe Connections
+        '''
+
+        Requester.injectConnectionClasses(HTTPConnection, Connection)
+
+    def get_session(retry=None):
+        '''
+        Returns the requests Session shared by all Connections
+        '''
+
+        with Connection.session_lock:
+            if Connection.session is None:
+                pool_size = max(
+                    Connection.pool_size,
+                    requests.adapters.DEFAULT_POOLSIZE
+                )
+                adapter = requests.adapters.HTTPAdapter(
+                    max_retries=(
+                        requests.adapters.DEFAULT_RETRIES if retry is None
+                        else retry
+                    ),
+                    pool_connections=pool_size,
+                    pool_maxsize=pool_size
+                )
+
+                Connection.session = requests.Session()
+                Connection.session.mount('https://', adapter)
+                Connection.session.mount('http://', adapter)
+
+            return Connection.session
+
+    def request(self, verb, url, body, headers):
+        '''
+        Stores the request, sent when the response is asked
+        '''
+
+        self.verb = verb
+        self.url = url
+        self.body = body
+        self.headers = headers
+
+    def getresponse(self):
+        '''
+        Sends the stored request and returns the response
+        GET requests are revalidated against the HttpCache if enabled
+        '''
+
+        url = f"{self.protocol}://{self.host}:{self.port}{self.url}"
+        headers = dict(self.headers)
+        cache = HttpCache.get_instance() if self.verb == 'GET' else None
+        cache_key = None
+        entry = None
+
+        if cache is not None:
+            cache_key = HttpCache.get_key(url, headers)
+            entry = cache.get(cache_key)
+
+            if entry is not None:
+                headers.update(HttpCache.get_conditional_headers(entry))
+
+        response = self.send(url, headers)
+
+        if entry is not None and response.status_code == 304:
+            # Fresh headers carry the current rate limit values
+            cached_headers = requests.structures.CaseInsensitiveDict(
+                entry['headers']
+            )
+            cached_headers.update(response.headers)
+
+            return Response(
+                status=200,
+                headers=cached_headers,
+                text=entry['text']
+            )
+
+        if cache is not None and response.status_code == 200 \
+           and HttpCache.is_cacheable(response.headers):
+            cache.set(cache_key, response.headers, response.text)
+
+        return Response(
+            status=response.status_code,
+            headers=response.headers,
+            text=response.text
+        )
+
+    def send(self, url, headers):
+        '''
+        Sends a request through the RateLimiter, retrying it when Github
+        asks to slow down
+        Every attempt is recorded by the Metrics, timed without the waits
+        '''
+
+        limiter = RateLimiter.get_instance()
+
+        for attempt in range(limiter.max_retries + 1):
+            limiter.before_request(self.verb, url)
+
+            start = time.monotonic()
+            response = Connection.get_session(self.retry).request(
+                self.verb,
+                url,
+                headers=headers,
+                data=self.body,
+                timeout=self.timeout,
+                verify=self.verify,
+                allow_redirects=False
+            )
+
+            Metrics.get_instance().record(
+                verb=self.verb,
+                url=self.url,
+                status=response.status_code,
+                latency=time.monotonic() - start,
+                size=len(response.content),
+                headers=response.headers
+            )
+
+            if not limiter.after_response(
+                status=response.status_code,
+                headers=response.headers,
+                text=response.text,
+                url=url
+            ) or attempt == limiter.max_retries:
+                return response
+
+        return response
+
+    def close(self):
+        '''
+        Keeps the shared Session open, closed at the end of the process
+        '''
+
+        return
+
+
+class HTTPConnection(Connection):
+    '''
+    Plain HTTP flavour of the Connection
+    '''
+
+    protocol = 'http'
+    default_port = 80
@@ -0,0 +1,62 @@
+"""
+GraphQL Client for the Workflow Spreader
+"""
+
+import itertools
+import os
+
+from github import GithubException
+
+
+class GraphQL:
+    url = os.getenv('GITHUB_GRAPHQL_URL', 'https://api.github.com/graphql')
+    batch_size = int(os.getenv('SPREADER_GRAPHQL_BATCH_SIZE', '50'))
+
+    def __init__(self, requester):
+        '''
+        GraphQL Constructor, reuses the PyGithub Requester so that queries
+        share its authentication and connections
+        '''
+
+        self.requester = requester
+
+    def query(self, query, variables=None):
+        '''
+        Runs a GraphQL query and returns its data
+        Partial data is returned when only some nodes are in error
+        '''
+
+        _, response = self.requester.requestJsonAndCheck(
+            'POST',
+            GraphQL.url,
+            input={
+                'query': query,
+                'variables': variables if variables else {}
+            }
+        )
+
+        if response.get('data') is None:
+            raise GithubException(
+                200,
+                response.get('errors'),
+                None
+            )
+
+        return response['data']
+
+    def batches(items, size=None):
+        '''
+        Splits items in batches that fit in a single query
+        items may be any iterable, consumed one batch at a time
+        '''
+
+        size = size if size else GraphQL.batch_size
+        items = iter(items)
+
+        while True:
+            batch = list(itertools.islice(items, size))
+
+            if not batch:
+                return
+
+            yield batch
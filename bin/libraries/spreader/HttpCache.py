@@ -0,0 +1,164 @@
+"""
+Persistent HTTP Cache for the Workflow Spreader
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class HttpCache:
+    '''
+    On-disk cache of GET responses, revalidated with conditional requests.
+    Github does not count 304 responses against the primary rate limit, so
+    unchanged resources are served from the cache for free.
+    Least recently used entries are evicted beyond the size limit.
+    '''
+
+    path = os.getenv('SPREADER_HTTP_CACHE', '')
+    # Size limit in MB
+    max_size = int(os.getenv('SPREADER_HTTP_CACHE_SIZE', '100')) \
+        * 1024 * 1024
+    instance = None
+    instance_lock = threading.Lock()
+
+    def __init__(self, path, max_size):
+        '''
+        HttpCache Constructor, indexes the existing entries
+        '''
+
+        self.path = path
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        os.makedirs(self.path, exist_ok=True)
+
+        files = []
+
+        for filename in os.listdir(self.path):
+            stat = os.stat(os.path.join(self.path, filename))
+            files.append((stat.st_mtime, filename, stat.st_size))
+
+        # Oldest entries first
+        for _, filename, size in sorted(files):
+            self.entries[filename] = size
+            self.size += size
+
+    def get_instance():
+        '''
+        Returns the run HttpCache, None if caching is disabled
+        '''
+
+        with HttpCache.instance_lock:
+            if HttpCache.instance is None and HttpCache.path:
+                HttpCache.instance = HttpCache(
+                    path=HttpCache.path,
+                    max_size=HttpCache.max_size
+                )
+
+            return HttpCache.instance
+
+    def get_key(url, headers):
+        '''
+        Computes the cache key of a request. Representation and credentials
+        are part of the key
+        '''
+
+        return hashlib.sha256(
+            '\n'.join([
+                url,
+                headers.get('Accept', ''),
+                headers.get('Authorization', '')
+            ]).encode('utf-8')
+        ).hexdigest()
+
+    def get(self, key):
+        '''
+        Returns a cached entry and marks it as recently used
+        '''
+
+        with self.lock:
+            if key not in self.entries:
+                return None
+
+            self.entries.move_to_end(key)
+
+        filename = os.path.join(self.path, key)
+
+        try:
+            with open(filename, 'r', encoding='UTF-8') as file:
+                entry = json.load(file)
+
+            os.utime(filename)
+
+            return entry
+
+        except (OSError, ValueError):
+            with self.lock:
+                self.size -= self.entries.pop(key, 0)
+
+            return None
+
+    def set(self, key, headers, text):
+        '''
+        Stores a response, evicting the least recently used entries
+        '''
+
+        content = json.dumps({
+            'headers': dict(headers),
+            'text': text
+        })
+        size = len(content.encode('utf-8'))
+
+        if size > self.max_size:
+            return
+
+        with self.lock:
+            with open(
+                os.path.join(self.path, key), 'w', encoding='UTF-8'
+            ) as file:
+                file.write(content)
+
+            self.size += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+
+            while self.size > self.max_size:
+                evicted, evicted_size = self.entries.popitem(last=False)
+                self.size -= evicted_size
+
+                try:
+                    os.remove(os.path.join(self.path, evicted))
+
+                except OSError:
+                    pass
+
+    def get_conditional_headers(entry):
+        '''
+        Returns the headers revalidating a cached entry
+        '''
+
+        headers = {}
+        cached_headers = {
+            name.lower(): value for name, value in entry['headers'].items()
+        }
+
+        if 'etag' in cached_headers:
+            headers['If-None-Match'] = cached_headers['etag']
+
+        if 'last-modified' in cached_headers:
+            headers['If-Modified-Since'] = cached_headers['last-modified']
+
+        return headers
+
+    def is_cacheable(headers):
+        '''
+        Checks if a response can be revalidated later on
+        '''
+
+        return any(
+            name.lower() in ('etag', 'last-modified') for name in headers
+        )
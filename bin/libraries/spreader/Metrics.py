@@ -0,0 +1,269 @@
+"""
+Github API Instrumentation for the Workflow Spreader
+"""
+
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+
+from ..Colors import Colors
+
+
+class Metrics:
+    '''
+    Records every Github request sent by the Connections, tagged with the
+    Repository and the phase of the run set by Metrics.tag on the calling
+    thread.
+    Records are aggregated by phase and endpoint for the end of run summary,
+    optionally traced as JSON lines and exported as a Prometheus textfile.
+    '''
+
+    trace_path = os.getenv('SPREADER_TRACE', '')
+    prometheus_path = os.getenv('SPREADER_METRICS', '')
+    phases = ('discovery', 'diff', 'write', 'pr')
+    # Applied in order, so that a file path can not look like an endpoint
+    endpoint_patterns = (
+        (re.compile(r'/repos/[^/]+/[^/]+'), '/repos/{owner}/{repo}'),
+        (re.compile(r'/orgs/[^/]+'), '/orgs/{org}'),
+        (re.compile(r'/contents/.*'), '/contents/{path}'),
+        (re.compile(r'/git/refs/.*'), '/git/refs/{ref}'),
+        (re.compile(r'/branches/.*'), '/branches/{branch}'),
+        (re.compile(r'/(commits|trees|blobs)/[^/]+'), r'/\1/{sha}'),
+        (re.compile(r'/(pulls|issues)/\d+'), r'/\1/{number}'),
+        (re.compile(r'/teams/[^/]+'), '/teams/{team}'),
+    )
+    context = threading.local()
+    instance = None
+    instance_lock = threading.Lock()
+
+    def __init__(self, trace_path=None, prometheus_path=None):
+        '''
+        Metrics Constructor
+        '''
+
+        self.prometheus_path = prometheus_path
+        self.trace = open(  # pylint: disable=consider-using-with
+            trace_path,
+            'w',
+            encoding='UTF-8'
+        ) if trace_path else None
+        self.stats = {}
+        self.rate = {}
+        self.lock = threading.Lock()
+
+    def get_instance():
+        '''
+        Returns the run Metrics
+        '''
+
+        with Metrics.instance_lock:
+            if Metrics.instance is None:
+                Metrics.instance = Metrics(
+                    trace_path=Metrics.trace_path,
+                    prometheus_path=Metrics.prometheus_path
+                )
+
+            return Metrics.instance
+
+    @contextlib.contextmanager
+    def tag(repository=None, phase=None):
+        '''
+        Tags the requests sent by the current thread within the block
+        Tags left to None are inherited from the enclosing block
+        '''
+
+        previous = (
+            getattr(Metrics.context, 'repository', None),
+            getattr(Metrics.context, 'phase', None)
+        )
+
+        Metrics.context.repository = repository if repository \
+            else previous[0]
+        Metrics.context.phase = phase if phase else previous[1]
+
+        try:
+            yield
+
+        finally:
+            Metrics.context.repository, Metrics.context.phase = previous
+
+    def get_endpoint(url):
+        '''
+        Returns the endpoint template of a request URL
+        '''
+
+        endpoint = url.split('?', 1)[0]
+
+        for pattern, replacement in Metrics.endpoint_patterns:
+            endpoint = pattern.sub(replacement, endpoint, count=1)
+
+        return endpoint
+
+    def record(  # pylint: disable=too-many-arguments
+            self, verb, url, status, latency, size, headers):
+        '''
+        Records a Github request
+        '''
+
+        record = {
+            'time': round(time.time(), 3),
+            'repository': getattr(Metrics.context, 'repository', None),
+            'phase': getattr(Metrics.context, 'phase', None),
+            'verb': verb,
+            'endpoint': Metrics.get_endpoint(url),
+            'status': status,
+            'latency': round(latency, 4),
+            'bytes': size,
+            'rate_remaining': headers.get('X-RateLimit-Remaining'),
+            'rate_limit': headers.get('X-RateLimit-Limit'),
+            'rate_used': headers.get('X-RateLimit-Used'),
+            'rate_resource': headers.get('X-RateLimit-Resource')
+        }
+
+        with self.lock:
+            stat = self.stats.setdefault(
+                (record['phase'] or 'other', verb, record['endpoint']),
+                {'requests': 0, 'seconds': 0, 'bytes': 0, 'statuses': {}}
+            )
+            stat['requests'] += 1
+            stat['seconds'] += latency
+            stat['bytes'] += size
+            stat['statuses'][status] = stat['statuses'].get(status, 0) + 1
+
+            if record['rate_remaining'] is not None:
+                self.rate[record['rate_resource'] or 'core'] = {
+                    'remaining': int(record['rate_remaining']),
+                    'limit': int(record['rate_limit'] or 0)
+                }
+
+            if self.trace:
+                self.trace.write(json.dumps(record) + '\n')
+
+    def report(self):
+        '''
+        Prints the requests by phase and endpoint
+        '''
+
+        if not self.stats:
+            return
+
+        print(
+            f"\n{Colors.BOLD}Github API Calls{Colors.ENDC}\n"
+            f"   {'phase':<10} {'endpoint':<52} {'calls':>6} {'errors':>6}"
+            f" {'avg ms':>7} {'KB':>8}"
+        )
+
+        for (phase, verb, endpoint), stat in sorted(
+            self.stats.items(),
+            key=lambda item: (
+                Metrics.phases.index(item[0][0])
+                if item[0][0] in Metrics.phases else len(Metrics.phases),
+                -item[1]['requests']
+            )
+        ):
+            errors = sum(
+                count for status, count in stat['statuses'].items()
+                if status >= 400
+            )
+
+            print(
+                f" » {phase:<10} {verb + ' ' + endpoint:<52}"
+                f" {stat['requests']:>6} {errors:>6}"
+                f" {1000 * stat['seconds'] / stat['requests']:>7.1f}"
+                f" {stat['bytes'] / 1024:>8.1f}"
+            )
+
+        print(
+            f" » {Colors.OKGREEN}"
+            f"{sum(stat['requests'] for stat in self.stats.values())}"
+            f"{Colors.ENDC} requests in "
+            f"{sum(stat['seconds'] for stat in self.stats.values()):.1f}s"
+        )
+
+    def get_prometheus(self):
+        '''
+        Returns the metrics in the Prometheus text format
+        '''
+
+        # Requests may be recorded meanwhile by a long running process
+        with self.lock:
+            stats = sorted(
+                (key, dict(stat, statuses=dict(stat['statuses'])))
+                for key, stat in self.stats.items()
+            )
+            rates = sorted(self.rate.items())
+
+        lines = [
+            '# HELP spreader_api_requests_total Github API requests.',
+            '# TYPE spreader_api_requests_total counter'
+        ]
+
+        for (phase, verb, endpoint), stat in stats:
+            for status, count in sorted(stat['statuses'].items()):
+                lines.append(
+                    f'spreader_api_requests_total{{phase="{phase}",'
+                    f'method="{verb}",endpoint="{endpoint}",'
+                    f'status="{status}"}} {count}'
+                )
+
+        for name, key, help_text in (
+            ('spreader_api_request_seconds_total', 'seconds',
+             'Time spent in Github API requests.'),
+            ('spreader_api_response_bytes_total', 'bytes',
+             'Size of the Github API responses.')
+        ):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+
+            for (phase, verb, endpoint), stat in stats:
+                lines.append(
+                    f'{name}{{phase="{phase}",method="{verb}",'
+                    f'endpoint="{endpoint}"}} {stat[key]:.6g}'
+                )
+
+        lines.append(
+            '# HELP spreader_api_rate_limit_remaining '
+            'Github API requests left until the rate limit reset.'
+        )
+        lines.append('# TYPE spreader_api_rate_limit_remaining gauge')
+
+        for resource, rate in rates:
+            lines.append(
+                f'spreader_api_rate_limit_remaining{{resource="{resource}"}}'
+                f' {rate["remaining"]}'
+            )
+
+        lines.append(
+            '# HELP spreader_last_run_timestamp_seconds '
+            'End of the last Spreader run.'
+        )
+        lines.append('# TYPE spreader_last_run_timestamp_seconds gauge')
+        lines.append(f'spreader_last_run_timestamp_seconds {time.time():.0f}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        '''
+        Writes the metrics in the Prometheus textfile format
+        The file is replaced at once, so that it is never read half written
+        '''
+
+        with open(f"{path}.tmp", 'w', encoding='UTF-8') as file:
+            file.write(self.get_prometheus())
+
+        os.replace(f"{path}.tmp", path)
+
+    def close(self):
+        '''
+        Ends the trace and writes the Prometheus textfile if enabled
+        '''
+
+        if self.trace:
+            self.trace.close()
+            self.trace = None
+
+        if self.prometheus_path:
+            self.write_prometheus(self.prometheus_path)
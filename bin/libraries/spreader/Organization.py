@@ -4,11 +4,14 @@ Wrapper Class for the Workflow Spreader
 
 import os
 import sys
+import threading
 
 import github
 
 from ..Common import Common
-from .Repository import Repository
+from .Connection import Connection
+from .GraphQL import GraphQL
+from .Repository import Repository, RepositoryRecord
 
 
 class Organization:
@@ -20,6 +23,13 @@ class Organization:
         Organization Contructor
         '''
 
+        self.repositories = {}
+        self.repositories_listed = False
+        self.repositories_lock = threading.Lock()
+        self.shard = None
+        self.repository_filter = None
+        self.skipped = {}
+
         # Some Environment Variable Checks
         if not os.getenv('GITHUB_TOKEN'):
             Common.github_output(
@@ -28,7 +38,14 @@ class Organization:
             )
             sys.exit(1)
 
-        github_connector = github.Github(os.getenv("GITHUB_TOKEN"))
+        # Repositories may be processed by several threads
+        Connection.install()
+
+        github_connector = github.Github(
+            os.getenv("GITHUB_TOKEN"),
+            base_url=os.getenv('GITHUB_API_URL', 'https://api.github.com'),
+            per_page=100
+        )
 
         if os.getenv('ORGANIZATION_NAME'):
             if os.getenv('ORGANIZATION_NAME'):
@@ -64,42 +81,250 @@ class Organization:
                 )
                 sys.exit(1)
 
+    def get_requester(self):
+        '''
+        Returns the PyGithub Requester of the Organization connection
+        '''
+
+        return self.org._requester  # pylint: disable=protected-access
+
+    def list_repositories(self):
+        '''
+        Lists the Organization Repositories page by page, indexing them by
+        lowercased name as soon as they are listed
+        Only a RepositoryRecord of each listed payload is kept
+        '''
+
+        requester = self.get_requester()
+        page = 1
+
+        while True:
+            headers, data = requester.requestJsonAndCheck(
+                'GET',
+                f"{self.org.url}/repos",
+                parameters={'per_page': 100, 'page': page}
+            )
+
+            for repository_data in data:
+                repository = Repository(
+                    record=RepositoryRecord(repository_data),
+                    requester=requester
+                )
+
+                with self.repositories_lock:
+                    self.repositories[repository.get_name().lower()] = \
+                        repository
+
+                yield repository
+
+            if 'rel="next"' not in headers.get('link', ''):
+                break
+
+            page += 1
+
+        self.repositories_listed = True
+
+    def fetch_repo(self, repository_name):
+        '''
+        Retrieve a Repository by name from the API
+        Raises UnknownObjectException if it does not exist
+        '''
+
+        requester = self.get_requester()
+        _, data = requester.requestJsonAndCheck(
+            'GET',
+            f"/repos/{self.org.login}/{repository_name}"
+        )
+
+        return Repository(
+            record=RepositoryRecord(data),
+            requester=requester
+        )
+
+    def get_repository_index(self):
+        '''
+        Lists the Organization Repositories once per run
+        Returns the Repositories indexed by lowercased name
+        '''
+
+        if not self.repositories_listed:
+            for _ in self.list_repositories():
+                pass
+
+        return self.repositories
+
     def get_repo(self, repository_name):
         '''
         Retrieve Unique Organization Repository by Name
         '''
 
+        repository = self.repositories.get(repository_name.lower())
+
+        if repository is None:
+            repository = self.fetch_repo(repository_name)
+
+            with self.repositories_lock:
+                repository = self.repositories.setdefault(
+                    repository_name.lower(),
+                    repository
+                )
+
+        return repository
+
+    def refresh_repo(self, repository_name):
+        '''
+        Retrieve a Repository again, dropping what was cached about it
+        Returns None if it no longer exists
+        '''
+
+        try:
+            repository = self.fetch_repo(repository_name)
+
+        except github.UnknownObjectException:
+            repository = None
+
+        with self.repositories_lock:
+            if repository is None:
+                self.repositories.pop(repository_name.lower(), None)
+
+            else:
+                self.repositories[repository_name.lower()] = repository
+
+        return repository
+
+    def get_planned_repo(self, entry):
+        '''
+        Retrieve the Repository of a Plan entry, from what the Plan knows
+        '''
+
         return Repository(
-            self.org.get_repo(repository_name)
+            record=RepositoryRecord({
+                'name': entry['repository'],
+                'full_name': entry['full_name'],
+                'default_branch': entry['default_branch'],
+                'url': entry['url']
+            }),
+            requester=self.get_requester()
         )
 
-    def get_repos(self):
+    def get_repos(self, predicate=None):
         '''
-        Retrieve Organization Repositories
+        Retrieve Organization Repositories, only those of the Shard if any,
+        and only those accepted by predicate if given
+        Until the Organization is listed, Repositories are yielded as their
+        page is received
         '''
 
-        repos = []
+        if self.repositories_listed:
+            with self.repositories_lock:
+                repositories = list(self.repositories.values())
 
-        for repo in self.org.get_repos():
-            repos.append(
-                Repository(
-                    github_repository=repo
-                )
+        else:
+            repositories = self.list_repositories()
+
+        for repository in repositories:
+            if self.in_shard(repository.get_name()) \
+               and (predicate is None or predicate(repository)) \
+               and self.is_eligible(repository):
+                yield repository
+
+    def get_named_repos(self, repository_names):
+        '''
+        Retrieve Organization Repositories by name, without listing the
+        Organization. Missing Repositories are skipped
+        '''
+
+        for repository_name in repository_names:
+            if not self.in_shard(repository_name):
+                continue
+
+            try:
+                repository = self.get_repo(repository_name)
+
+            except github.UnknownObjectException:
+                continue
+
+            if self.is_eligible(repository):
+                yield repository
+
+    def get_property_values(self, property_name):
+        '''
+        Retrieve a Custom Property of all Organization Repositories
+        Returns the values by lowercased Repository name
+        '''
+
+        requester = self.get_requester()
+        values = {}
+        page = 1
+
+        while True:
+            _, data = requester.requestJsonAndCheck(
+                'GET',
+                f"{self.org.url}/properties/values",
+                parameters={'per_page': 100, 'page': page}
             )
 
-        return repos
+            for repository in data:
+                for custom_property in repository['properties']:
+                    if custom_property['property_name'] == property_name:
+                        values[repository['repository_name'].lower()] = \
+                            custom_property['value']
+
+            if len(data) < 100:
+                return values
 
-    def repo_exists(self, repo_name):
+            page += 1
+
+    def set_shard(self, shard):
+        '''
+        Restricts the Organization Repositories to a Shard
+        '''
+
+        self.shard = shard
+
+    def set_repository_filter(self, repository_filter):
         '''
-        Checks if a Repository exists in an Organization
+        Skips the Repositories rejected by a RepositoryFilter
         '''
 
-        for repo in self.org.get_repos():
-            if repo.name.lower() == repo_name.lower():
-                return True
+        self.repository_filter = repository_filter
+
+    def is_eligible(self, repository):
+        '''
+        Checks a Repository metadata against the RepositoryFilter, counting
+        the skipped Repositories by reason
+        '''
+
+        if self.repository_filter is None:
+            return True
+
+        reason = self.repository_filter.get_skip_reason(
+            repository.get_name(),
+            repository.get_metadata()
+        )
+
+        if reason is None:
+            return True
+
+        with self.repositories_lock:
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
 
         return False
 
+    def in_shard(self, repo_name):
+        '''
+        Checks if a Repository belongs to the processed Shard
+        '''
+
+        return self.shard is None or self.shard.contains(repo_name)
+
+    def get_graphql(self):
+        '''
+        Returns a GraphQL Client sharing the Organization connection
+        '''
+
+        return GraphQL(self.get_requester())
+
     def get_name(self):
         '''
         Return the Organization Name
@@ -0,0 +1,155 @@
+"""
+Propagation Plan for the Workflow Spreader
+"""
+
+import json
+from datetime import datetime
+
+from ..Colors import Colors
+
+
+class Plan:
+    version = 2
+
+    def __init__(
+            self, organization_name, repositories=None, unchanged=0,
+            failed=None):
+        '''
+        Plan Constructor
+        repositories are the planned Repository entries, unchanged the number
+        of Repositories found up to date, failed the names of those that
+        could not be planned
+        '''
+
+        self.organization_name = organization_name
+        self.repositories = repositories if repositories else []
+        self.unchanged = unchanged
+        self.failed = failed if failed else []
+
+    def add(self, repository_name, entry):
+        '''
+        Adds the entry of a Repository, None if it could not be planned
+        '''
+
+        if entry is None:
+            self.failed.append(repository_name)
+
+        elif not entry['workflows']:
+            self.unchanged += 1
+
+        else:
+            self.repositories.append(entry)
+
+    def get_estimate(self):
+        '''
+        Estimates the requests needed to apply the Plan, by endpoint class
+        '''
+
+        estimate = {
+            'refs': 0,
+            'git': 0,
+            'pulls': 0,
+            'issues': 0
+        }
+
+        # The Repositories are built from the entries, without request
+        for entry in self.repositories:
+            pull_request = entry['pull_request']
+
+            # Branch creation, then move of the Branch ref
+            estimate['refs'] += 1 if entry['branch_head'] else 2
+            # Head commit read, tree and commit creation
+            estimate['git'] += 3
+
+            if pull_request['number']:
+                # Review requests read and comment
+                estimate['pulls'] += 1
+                estimate['issues'] += 1
+
+                # Pull Request read and title update
+                if pull_request['title_changed']:
+                    estimate['pulls'] += 2
+
+            else:
+                estimate['pulls'] += 1
+
+            # Review requests update, if reviewers are asked
+            if pull_request['reviewers']:
+                estimate['pulls'] += 1
+
+        estimate['total'] = sum(estimate.values())
+
+        return estimate
+
+    def to_dict(self):
+        '''
+        Serializes the Plan
+        '''
+
+        return {
+            'version': Plan.version,
+            'organization': self.organization_name,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'unchanged': self.unchanged,
+            'failed': self.failed,
+            'estimate': self.get_estimate(),
+            'repositories': self.repositories
+        }
+
+    def save(self, path):
+        '''
+        Writes the Plan as JSON
+        '''
+
+        with open(path, 'w', encoding='UTF-8') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def load(path):
+        '''
+        Reads a Plan written by save
+        '''
+
+        with open(path, 'r', encoding='UTF-8') as file:
+            data = json.load(file)
+
+        if data.get('version') != Plan.version:
+            raise ValueError(
+                f"Unsupported Plan version {data.get('version')}"
+            )
+
+        return Plan(
+            organization_name=data['organization'],
+            repositories=data['repositories'],
+            unchanged=data['unchanged'],
+            failed=data.get('failed')
+        )
+
+    def print_summary(self):
+        '''
+        Prints the blast radius and the cost of the Plan
+        '''
+
+        estimate = self.get_estimate()
+        workflows = sum(
+            len(entry['workflows']) for entry in self.repositories
+        )
+
+        print(
+            f"\n{Colors.BOLD}Plan for {self.organization_name}{Colors.ENDC}\n"
+            f" » {Colors.OKCYAN}{len(self.repositories)}{Colors.ENDC}"
+            f" Repositories to update, {workflows} Workflows,"
+            f" {self.unchanged} Repositories up to date\n"
+            f" » Estimated requests : {estimate['total']} ("
+            + ', '.join(
+                f"{name}: {count}" for name, count in estimate.items()
+                if name != 'total'
+            )
+            + ")"
+        )
+
+        if self.failed:
+            print(
+                f" » {Colors.FAIL}{len(self.failed)}{Colors.ENDC}"
+                f" Repositories could not be planned: "
+                f"{', '.join(sorted(self.failed))}"
+            )
@@ -0,0 +1,482 @@
+"""
+Propagation Engine for the Workflow Spreader
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from ..Colors import Colors
+from ..Common import Common
+from ..Output import Output
+from .Metrics import Metrics
+from .Plan import Plan
+from .Report import Report
+
+
+class Propagator:
+    concurrency = int(os.getenv('SPREADER_CONCURRENCY', '4'))
+    # Items waiting for a worker, on top of those being processed
+    queue_size = int(os.getenv('SPREADER_QUEUE_SIZE', '100'))
+
+    def __init__(
+            self, organization, catalog, concurrency=None, state_store=None):
+        '''
+        Propagator Constructor
+        '''
+
+        self.organization = organization
+        self.catalog = catalog
+        self.state_store = state_store
+        self.report = Report()
+        self.concurrency = max(
+            1,
+            concurrency if concurrency else Propagator.concurrency
+        )
+        self.repository_locks = {}
+        self.repository_locks_lock = threading.Lock()
+
+    def get_repository_lock(self, repository_name):
+        '''
+        Returns the Lock serializing the writes on a Repository
+        '''
+
+        with self.repository_locks_lock:
+            return self.repository_locks.setdefault(
+                repository_name.lower(),
+                threading.Lock()
+            )
+
+    def run(self, function, items):
+        '''
+        Runs function on every item, processing independent Repositories in
+        parallel. The output of each item is printed in one block
+        items may be a generator, consumed as workers become available so
+        that at most queue_size items are waiting
+        '''
+
+        output = Output.install()
+        slots = threading.BoundedSemaphore(
+            self.concurrency + max(0, Propagator.queue_size)
+        )
+
+        def worker(item):
+            '''
+            Processes an item, then frees its slot for the next one
+            '''
+
+            try:
+                with output.buffered():
+                    return function(item)
+
+            finally:
+                if self.state_store:
+                    self.state_store.checkpoint()
+
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = []
+
+            for item in items:
+                slots.acquire()  # pylint: disable=consider-using-with
+                futures.append(executor.submit(worker, item))
+
+            return [future.result() for future in futures]
+
+    def propagate(self, configurations):
+        '''
+        Propagates the Workflows of all Configurations, as they are found
+        '''
+
+        print(
+            f"\n{Colors.BOLD}"
+            f"Propagating Workflows "
+            f"with {self.concurrency} workers ..."
+            f"{Colors.ENDC}"
+        )
+
+        return self.run(self.propagate_configuration, configurations)
+
+    def plan(self, configurations):
+        '''
+        Discovers the changes needed by all Configurations without writing
+        Returns the Plan
+        '''
+
+        print(
+            f"\n{Colors.BOLD}"
+            f"Planning Workflows "
+            f"with {self.concurrency} workers ..."
+            f"{Colors.ENDC}"
+        )
+
+        plan = Plan(organization_name=self.organization.get_name())
+
+        def plan_configuration(config):
+            '''
+            Plans a Configuration, keeping its Repository name for failures
+            '''
+
+            return config.repository_name, self.plan_configuration(config)
+
+        for repository_name, entry in self.run(
+            plan_configuration,
+            configurations
+        ):
+            plan.add(repository_name, entry)
+
+        return plan
+
+    def apply(self, plan):
+        '''
+        Applies the Plan without reading again what it already knows
+        '''
+
+        print(
+            f"\n{Colors.BOLD}"
+            f"Applying Plan to "
+            f"{str(len(plan.repositories))} Repositories "
+            f"with {self.concurrency} workers ..."
+            f"{Colors.ENDC}"
+        )
+
+        return self.run(
+            partial(self.apply_entry, announce=True),
+            plan.repositories
+        )
+
+    def propagate_configuration(self, config):
+        '''
+        Propagates the Workflows of a Configuration to its Repository
+        Returns True if the Repository is up to date at the end
+        '''
+
+        entry = self.plan_configuration(config)
+
+        if entry is None:
+            self.report.record(
+                repository=f"{self.organization.get_name()}/"
+                f"{config.repository_name}",
+                status='failed'
+            )
+
+            return False
+
+        if not entry['workflows']:
+            self.report.record(
+                repository=entry['full_name'],
+                status='up-to-date'
+            )
+
+            return True
+
+        return self.apply_entry(
+            entry,
+            repository=self.organization.get_repo(entry['repository'])
+        )
+
+    def plan_configuration(self, config):
+        '''
+        Plans the changes of a Configuration on its Repository
+        Returns the Repository entry of the Plan, None on error
+        '''
+
+        with Metrics.tag(repository=config.repository_name, phase='diff'):
+            try:
+                repository = self.organization.get_repo(
+                    config.repository_name
+                )
+
+                print(
+                    f" » {Colors.OKCYAN}{repository.get_full_name()}"
+                    f"{Colors.ENDC}"
+                )
+
+                branch_name = config.get_branch_name()
+
+                if branch_name is None:
+                    raise ValueError('no incoming-changes.branch-name set')
+
+                incoming_changes = config.data['incoming-changes']
+                title = incoming_changes['pull-request']['title']
+                workflows, unchanged = self.diff_workflows(
+                    repository=repository,
+                    config=config
+                )
+                entry = {
+                    'repository': config.repository_name,
+                    'full_name': repository.get_full_name(),
+                    'url': repository.get_api_url(),
+                    'default_branch': repository.get_default_branch(),
+                    'branch': branch_name,
+                    'branch_head': False,
+                    'default_branch_head': None,
+                    'commit_name': incoming_changes['commit-name'],
+                    'pull_request': {
+                        'title': title,
+                        'comment': 'Workflow Automatic Update trigger',
+                        'reviewers': config.data.get('reviewers', []),
+                        'number': None,
+                        'title_changed': False
+                    },
+                    'variables': config.data.get('variables', {}),
+                    'workflows': [
+                        {
+                            'name': workflow.name,
+                            'destination': workflow.destination,
+                            'blob_sha': workflow.blob_sha,
+                            'action': action
+                        }
+                        for workflow, action in workflows
+                    ],
+                    # Recorded as up to date on the Branch once it is written
+                    'unchanged': [
+                        {
+                            'name': workflow.name,
+                            'blob_sha': workflow.blob_sha
+                        }
+                        for workflow in unchanged
+                    ]
+                }
+
+                if not workflows:
+                    return entry
+
+                entry['branch_head'] = repository.get_branch_head(branch_name)
+
+                if entry['branch_head']:
+                    # Without the Branch, there can't be any Pull Request
+                    pr = repository.get_branch_pr(branch_name)
+
+                    if pr:
+                        entry['pull_request']['number'] = pr.number
+                        entry['pull_request']['title_changed'] = \
+                            pr.title != title
+
+                else:
+                    entry['default_branch_head'] = repository.get_branch_head(
+                        repository.get_default_branch()
+                    )
+
+                return entry
+
+            except Exception as ex:  # pylint: disable=broad-except
+                Common.github_output(
+                    'error',
+                    f"Could not plan Workflows of "
+                    f"{config.repository_name}: {str(ex)}"
+                )
+
+                return None
+
+    def apply_entry(self, entry, announce=False, repository=None):
+        '''
+        Applies the Plan entry of a Repository
+        Without the Repository, it is built from the entry without request
+        Returns True if the Repository is up to date at the end
+        '''
+
+        try:
+            if repository is None:
+                repository = self.organization.get_planned_repo(entry)
+
+            if announce:
+                print(
+                    f" » {Colors.OKCYAN}{repository.get_full_name()}"
+                    f"{Colors.ENDC}"
+                )
+
+            with self.get_repository_lock(repository.get_full_name()):
+                result = self.write_workflows(
+                    repository=repository,
+                    entry=entry
+                )
+
+        except Exception as ex:  # pylint: disable=broad-except
+            Common.github_output(
+                'error',
+                f"Could not propagate Workflows to "
+                f"{entry['full_name']}: {str(ex)}"
+            )
+
+            result = False
+
+        self.report.record(
+            repository=entry['full_name'],
+            status='updated' if result else 'failed',
+            workflows=len(entry['workflows']) if result else 0
+        )
+
+        return result
+
+    def diff_workflows(self, repository, config):
+        '''
+        Returns the Workflows of a Configuration that differ on the Repository
+        with the action to apply, create or update, and those that do not
+        '''
+
+        workflows = []
+        unchanged = []
+
+        if repository.branch_exists(config.get_branch_name()):
+            check_branch = config.get_branch_name()
+        else:
+            check_branch = repository.get_default_branch()
+
+        head_sha = repository.get_branch_head(check_branch) \
+            if self.state_store else None
+
+        for name in config.data['workflows']:
+            workflow = self.catalog.get(name, config.data.get('variables'))
+
+            # Unknown Workflows and missing variables are reported up front
+            # by the Catalog
+            if workflow is None:
+                continue
+
+            if self.state_store and self.state_store.is_up_to_date(
+                repository=repository.get_full_name(),
+                workflow=name,
+                branch=check_branch,
+                blob_sha=workflow.blob_sha,
+                head_sha=head_sha
+            ):
+                print(
+                    f"   » File "
+                    f"{Colors.OKBLUE}{workflow.path}{Colors.ENDC}"
+                    f" unchanged since last run. Skipping file."
+                )
+
+                unchanged.append(workflow)
+                continue
+
+            remote_blob_sha = repository.get_file_blob_sha(
+                path=workflow.destination,
+                branch_name=check_branch
+            )
+
+            if workflow.blob_sha == remote_blob_sha:
+                print(
+                    f"   » File "
+                    f"{Colors.OKBLUE}{workflow.path}{Colors.ENDC}"
+                    f" unchanged. Skipping file."
+                )
+
+                unchanged.append(workflow)
+
+                if self.state_store:
+                    self.state_store.set(
+                        repository=repository.get_full_name(),
+                        workflow=name,
+                        branch=check_branch,
+                        blob_sha=workflow.blob_sha,
+                        head_sha=head_sha
+                    )
+
+            else:
+                print(
+                    f"   » File "
+                    f"{Colors.OKBLUE}{workflow.path}{Colors.ENDC}"
+                    f" updated. Added to update list."
+                )
+
+                workflows.append(
+                    (workflow, 'update' if remote_blob_sha else 'create')
+                )
+
+        return workflows, unchanged
+
+    def write_workflows(self, repository, entry):
+        '''
+        Writes the Workflows on the incoming Branch and opens the Pull Request
+        '''
+
+        branch_name = entry['branch']
+        pull_request = entry['pull_request']
+        workflows = []
+
+        for planned_workflow in entry['workflows']:
+            workflow = self.catalog.get(
+                planned_workflow['name'],
+                entry.get('variables')
+            )
+
+            if workflow is None \
+               or workflow.blob_sha != planned_workflow['blob_sha']:
+                Common.github_output(
+                    'error',
+                    f"Workflow {planned_workflow['name']} changed since the "
+                    f"Plan of {entry['full_name']} was made"
+                )
+
+                return False
+
+            workflows.append(workflow)
+
+        # What the Plan knows does not have to be read again
+        repository.set_branch_head(branch_name, entry['branch_head'])
+
+        if entry['default_branch_head']:
+            repository.set_branch_head(
+                entry['default_branch'],
+                entry['default_branch_head']
+            )
+
+        repository.set_branch_pr(
+            branch_name,
+            pull_request['number'],
+            title=None if pull_request['title_changed']
+            else pull_request['title']
+        )
+
+        with Metrics.tag(repository=entry['repository'], phase='write'):
+            repository.create_branch(branch_name)
+
+            if not repository.put_files(
+                branch_name=branch_name,
+                files={
+                    workflow.destination: workflow.content.decode('utf-8')
+                    for workflow in workflows
+                },
+                commit_text_tpl=entry['commit_name']
+            ):
+                return False
+
+        with Metrics.tag(repository=entry['repository'], phase='pr'):
+            pr_create_result = repository.create_pr(
+                branch_name=branch_name,
+                title=pull_request['title'],
+                comment=pull_request['comment'],
+                reviewers=pull_request['reviewers']
+            )
+
+        if not pr_create_result:
+            Common.github_output(
+                'error',
+                "Could not create Pull Request"
+            )
+
+            return False
+
+        if self.state_store:
+            # Every checked Workflow is up to date on the new Branch head
+            checked = [
+                (workflow.name, workflow.blob_sha) for workflow in workflows
+            ] + [
+                (workflow['name'], workflow['blob_sha'])
+                for workflow in entry.get('unchanged', [])
+            ]
+
+            for name, blob_sha in checked:
+                self.state_store.set(
+                    repository=repository.get_full_name(),
+                    workflow=name,
+                    branch=branch_name,
+                    blob_sha=blob_sha,
+                    head_sha=repository.get_branch_head(branch_name),
+                    pr_number=pr_create_result.number
+                )
+
+        return True
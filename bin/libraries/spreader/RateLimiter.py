@@ -0,0 +1,214 @@
+"""
+Rate Limit aware Request Scheduler for the Workflow Spreader
+"""
+
+import os
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+
+from ..Colors import Colors
+from ..Common import Common
+
+
+class RateLimiter:
+    '''
+    Schedules the Github requests of all threads.
+    Writes are spaced to stay under the secondary rate limits, and every
+    request is paused, then retried, when Github asks to slow down or when
+    the primary rate limit of its resource is exhausted.
+    '''
+
+    # Writes per second, Github advises at most one per second
+    write_rate = float(os.getenv('SPREADER_WRITE_RATE', '1'))
+    max_retries = int(os.getenv('SPREADER_MAX_RETRIES', '5'))
+    write_verbs = ('POST', 'PATCH', 'PUT', 'DELETE')
+    instance = None
+    instance_lock = threading.Lock()
+
+    def __init__(self, write_rate, max_retries):
+        '''
+        RateLimiter Constructor
+        '''
+
+        self.write_interval = 1 / write_rate if write_rate > 0 else 0
+        self.min_write_interval = self.write_interval
+        self.max_retries = max_retries
+        self.next_write = 0
+        self.paused_until = 0
+        # Primary rate limit state by X-RateLimit-Resource
+        self.resources = {}
+        self.pauses = 0
+        self.lock = threading.Lock()
+
+    def get_instance():
+        '''
+        Returns the run RateLimiter
+        '''
+
+        with RateLimiter.instance_lock:
+            if RateLimiter.instance is None:
+                RateLimiter.instance = RateLimiter(
+                    write_rate=RateLimiter.write_rate,
+                    max_retries=RateLimiter.max_retries
+                )
+
+            return RateLimiter.instance
+
+    def get_resource(url):
+        '''
+        Returns the rate limit resource a request URL is charged to
+        '''
+
+        path = urllib.parse.urlsplit(url).path
+
+        if path.endswith('/graphql'):
+            return 'graphql'
+
+        if '/search/' in path:
+            return 'search'
+
+        return 'core'
+
+    def is_write(verb, url):
+        '''
+        Checks if a request writes, GraphQL queries are sent as POST but
+        only read
+        '''
+
+        return verb in RateLimiter.write_verbs \
+            and RateLimiter.get_resource(url) != 'graphql'
+
+    def get_delay(self, verb, url=''):
+        '''
+        Reserves the slot of a request
+        Returns how long to wait before sending it, in seconds
+        '''
+
+        with self.lock:
+            now = time.time()
+            resource = self.resources.get(RateLimiter.get_resource(url), {})
+            start = max(
+                now,
+                self.paused_until,
+                resource.get('paused_until', 0)
+            )
+
+            if RateLimiter.is_write(verb, url):
+                start = max(start, self.next_write)
+                self.next_write = start + self.write_interval
+
+        return start - now
+
+    def before_request(self, verb, url=''):
+        '''
+        Waits until the request can be sent
+        '''
+
+        delay = self.get_delay(verb, url)
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def after_response(self, status, headers, text, url=''):
+        '''
+        Records the rate limit state of a response
+        Returns True if the request has to be retried
+        '''
+
+        with self.lock:
+            resource = self.resources.setdefault(
+                headers.get('X-RateLimit-Resource')
+                or RateLimiter.get_resource(url),
+                {'remaining': None, 'paused_until': 0}
+            )
+
+            if 'X-RateLimit-Remaining' in headers:
+                resource['remaining'] = int(headers['X-RateLimit-Remaining'])
+                resource['limit'] = int(headers.get('X-RateLimit-Limit', 0))
+                resource['reset'] = int(headers.get('X-RateLimit-Reset', 0))
+
+            if status not in (403, 429):
+                # Slowly come back to the configured write rate
+                self.write_interval = max(
+                    self.min_write_interval,
+                    self.write_interval * 0.9
+                )
+
+                # Primary rate limit exhausted: wait for its reset
+                if resource['remaining'] == 0:
+                    resource['paused_until'] = max(
+                        resource['paused_until'],
+                        resource['reset']
+                    )
+
+                return False
+
+            now = time.time()
+
+            if 'Retry-After' in headers:
+                delay = int(headers['Retry-After'])
+
+            elif resource['remaining'] == 0:
+                delay = max(0, resource['reset'] - now)
+
+            elif 'rate limit' in (text or '').lower():
+                delay = 60
+
+            else:
+                return False
+
+            if resource['remaining'] == 0:
+                # Primary rate limit: only its resource waits
+                resource['paused_until'] = max(
+                    resource['paused_until'],
+                    resource['reset'],
+                    now + delay
+                )
+
+            else:
+                # Secondary rate limits: every request waits, and the writes
+                # are slowed down
+                self.write_interval = min(
+                    max(self.write_interval * 2, 1),
+                    60
+                )
+                self.paused_until = max(self.paused_until, now + delay)
+
+            self.pauses += 1
+
+        Common.github_output(
+            'warning',
+            f"Github rate limit reached, pausing requests for "
+            f"{int(delay)}s"
+        )
+
+        return True
+
+    def report(self):
+        '''
+        Prints the remaining rate limit budget of each resource
+        '''
+
+        resources = {
+            name: resource for name, resource in self.resources.items()
+            if resource['remaining'] is not None
+        }
+
+        if not resources:
+            return
+
+        print(f"\n{Colors.BOLD}Github API Budget{Colors.ENDC}")
+
+        for name, resource in sorted(resources.items()):
+            reset = datetime.fromtimestamp(resource['reset']) \
+                .strftime('%H:%M:%S')
+
+            print(
+                f" » {name:<8} {Colors.OKGREEN}{resource['remaining']}/"
+                f"{resource['limit']}{Colors.ENDC}"
+                f" requests remaining, reset at {reset}"
+            )
+
+        print(f" » Paused {self.pauses} times on rate limits")
@@ -0,0 +1,139 @@
+"""
+Branch and Pull Request State Prefetch for the Workflow Spreader
+"""
+
+import os
+
+from github import GithubException
+
+from ..Common import Common
+from .GraphQL import GraphQL
+from .Metrics import Metrics
+
+
+class RefState:
+    '''
+    Reads, for a batch of Repositories in a single GraphQL query, the
+    default Branch head, the head of the incoming Branch if it exists and
+    its open Pull Request, and fills the Repository caches with them so
+    that the diff and write stages do not ask again.
+    '''
+
+    backend = os.getenv('SPREADER_REF_BACKEND', 'graphql')
+
+    def get_query(size):
+        '''
+        Returns the query of a batch of size Repositories
+        '''
+
+        arguments = ', '.join(
+            f"$name{index}: String!, $ref{index}: String!"
+            for index in range(size)
+        )
+        fields = ' '.join(
+            f"repo{index}: repository(owner: $owner, name: $name{index}) {{"
+            " defaultBranchRef { target { oid } }"
+            f" incoming: ref(qualifiedName: $ref{index}) {{"
+            " target { oid }"
+            " associatedPullRequests(states: OPEN, first: 1)"
+            " { nodes { number title } } } }"
+            for index in range(size)
+        )
+
+        return f"query($owner: String!, {arguments}) {{ {fields} }}"
+
+    def fetch(organization, graphql, repositories):
+        '''
+        Reads the Branch and Pull Request state of a batch of
+        (Repository, incoming Branch name) and fills the Repository caches
+        Repositories missing from the response are left to the REST API
+        '''
+
+        variables = {'owner': organization.get_name()}
+
+        for index, (repository, branch_name) in enumerate(repositories):
+            variables[f"name{index}"] = repository.get_name()
+            variables[f"ref{index}"] = f"refs/heads/{branch_name}"
+
+        data = graphql.query(
+            RefState.get_query(len(repositories)),
+            variables
+        )
+
+        for index, (repository, branch_name) in enumerate(repositories):
+            node = data.get(f"repo{index}")
+
+            if not node:
+                continue
+
+            if node.get('defaultBranchRef'):
+                repository.set_branch_head(
+                    repository.get_default_branch(),
+                    node['defaultBranchRef']['target']['oid']
+                )
+
+            incoming = node.get('incoming')
+
+            if not incoming:
+                # Without the Branch, there can't be any Pull Request
+                repository.set_branch_head(branch_name, False)
+                repository.set_branch_pr(branch_name, None)
+                continue
+
+            repository.set_branch_head(
+                branch_name,
+                incoming['target']['oid']
+            )
+
+            pulls = incoming['associatedPullRequests']['nodes']
+
+            if pulls:
+                repository.set_branch_pr(
+                    branch_name,
+                    pulls[0]['number'],
+                    title=pulls[0]['title']
+                )
+
+            else:
+                repository.set_branch_pr(branch_name, None)
+
+    def prefetch(organization, configurations):
+        '''
+        Prefetches the Branch and Pull Request state of a batch of
+        Configurations at a time
+        Yields the Configurations once their batch is prefetched
+        '''
+
+        graphql = organization.get_graphql()
+
+        for configs in GraphQL.batches(configurations):
+            repositories = []
+
+            for config in configs:
+                # The Propagator reports Configurations without Branch
+                if config.get_branch_name() is None:
+                    continue
+
+                try:
+                    repositories.append((
+                        organization.get_repo(config.repository_name),
+                        config.get_branch_name()
+                    ))
+
+                except Exception:  # pylint: disable=broad-except
+                    continue
+
+            if repositories:
+                try:
+                    with Metrics.tag(phase='diff'):
+                        RefState.fetch(organization, graphql, repositories)
+
+                except GithubException as ex:
+                    Common.github_output(
+                        'warning',
+                        "Could not prefetch the Branch state of "
+                        f"{len(repositories)} Repositories, "
+                        f"falling back to REST: {str(ex)}"
+                    )
+
+            yield from configs
@@ -0,0 +1,121 @@
+"""
+Run Report for the Workflow Spreader
+"""
+
+import json
+import threading
+
+from ..Colors import Colors
+
+
+class Report:
+    statuses = ('updated', 'up-to-date', 'failed')
+
+    def __init__(self, shard=None, repositories=None, skipped=None):
+        '''
+        Report Constructor
+        skipped counts the Repositories left out by the RepositoryFilter, by
+        reason
+        '''
+
+        self.shard = shard
+        self.repositories = repositories if repositories else {}
+        self.skipped = skipped if skipped else {}
+        self.lock = threading.Lock()
+
+    def record(self, repository, status, workflows=0):
+        '''
+        Records the outcome of a Repository
+        '''
+
+        with self.lock:
+            self.repositories[repository] = {
+                'status': status,
+                'workflows': workflows
+            }
+
+    def get_summary(self):
+        '''
+        Counts the Repositories by status
+        '''
+
+        summary = {status: 0 for status in Report.statuses}
+        summary['workflows'] = 0
+
+        for outcome in self.repositories.values():
+            summary[outcome['status']] += 1
+            summary['workflows'] += outcome['workflows']
+
+        return summary
+
+    def save(self, path):
+        '''
+        Writes the Report as JSON
+        '''
+
+        with open(path, 'w', encoding='UTF-8') as file:
+            json.dump(
+                {
+                    'shard': self.shard,
+                    'summary': self.get_summary(),
+                    'skipped': self.skipped,
+                    'repositories': self.repositories
+                },
+                file,
+                indent=2
+            )
+
+    def load(path):
+        '''
+        Reads a Report written by save
+        '''
+
+        with open(path, 'r', encoding='UTF-8') as file:
+            data = json.load(file)
+
+        return Report(
+            shard=data.get('shard'),
+            repositories=data['repositories'],
+            skipped=data.get('skipped')
+        )
+
+    def merge(reports):
+        '''
+        Combines the Reports of several shards
+        '''
+
+        merged = Report()
+
+        for report in reports:
+            merged.repositories.update(report.repositories)
+
+            for reason, count in report.skipped.items():
+                merged.skipped[reason] = merged.skipped.get(reason, 0) + count
+
+        return merged
+
+    def print_summary(self):
+        '''
+        Prints the outcome of the run
+        '''
+
+        summary = self.get_summary()
+
+        print(
+            f"\n{Colors.BOLD}Summary{Colors.ENDC}\n"
+            f" » {Colors.OKGREEN}{summary['updated']}{Colors.ENDC}"
+            f" Repositories updated with {summary['workflows']} Workflows\n"
+            f" » {summary['up-to-date']} Repositories up to date\n"
+            f" » {Colors.FAIL}{summary['failed']}{Colors.ENDC}"
+            f" Repositories failed"
+        )
+
+        if self.skipped:
+            print(
+                f" » {sum(self.skipped.values())} Repositories skipped ("
+                + ', '.join(
+                    f"{reason}: {count}"
+                    for reason, count in sorted(self.skipped.items())
+                )
+                + ")"
+            )
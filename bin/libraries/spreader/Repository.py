@@ -2,101 +2,268 @@
 Wrapper Class for the Workflow Spreader
 """
 
-import hashlib
 import os
 
-from github import GithubException, Team
+import github
+from github import GithubException, InputGitTreeElement, Team
 
 from ..Colors import Colors
 from ..Common import Common
 
 
+class RepositoryRecord:  # pylint: disable=too-few-public-methods
+    '''
+    The fields of a listed Repository that the Spreader uses, without the
+    rest of the Github payload
+    '''
+
+    __slots__ = (
+        'name', 'full_name', 'default_branch', 'archived', 'disabled',
+        'fork', 'private', 'visibility', 'size', 'created_at', 'pushed_at',
+        'node_id', 'topics', 'url'
+    )
+
+    def __init__(self, data):
+        '''
+        RepositoryRecord Constructor, from a Github Repository payload
+        '''
+
+        for field in RepositoryRecord.__slots__:
+            setattr(self, field, data.get(field))
+
+    def to_dict(self):
+        '''
+        Returns the fields as a Github Repository payload
+        '''
+
+        return {
+            field: getattr(self, field)
+            for field in RepositoryRecord.__slots__
+        }
+
+
 class Repository:
 
-    def __init__(self, github_repository):
+    def __init__(self, record, requester):
         '''
         Repository Contructor
+        The PyGithub Repository is only built once the API is called
+        '''
+
+        self.record = record
+        self.requester = requester
+        self.github_repository = None
+        self.directory_listings = {}
+        self.branch_heads = {}
+        self.branch_prs = {}
+        self.review_teams = {}
+
+    def clear_caches(self):
+        '''
+        Drops the Branch, Pull Request, Team and listing state read so far,
+        so that the next spread reads it again
         '''
 
-        self.github_repository = github_repository
+        self.directory_listings = {}
+        self.branch_heads = {}
+        self.branch_prs = {}
+        self.review_teams = {}
+
+    def get_github_repository(self):
+        '''
+        Returns the PyGithub Repository, built on first use without request
+        '''
+
+        if self.github_repository is None:
+            self.github_repository = github.Repository.Repository(
+                self.requester,
+                {},
+                self.record.to_dict(),
+                completed=False
+            )
+
+        return self.github_repository
 
     def get_full_name(self):
         '''
         Get the Repository Full Name including the Org
         '''
 
-        return self.github_repository.full_name
+        return self.record.full_name
 
     def get_name(self):
         '''
         Get the Repository Name
         '''
 
-        return self.github_repository.name
+        return self.record.name
+
+    def get_metadata(self):
+        '''
+        Returns the Repository attributes the Spreader uses, as listed
+        '''
+
+        return self.record.to_dict()
+
+    def get_topics(self):
+        '''
+        Returns the Repository Topics
+        Topics are part of the Organization listing, read only if missing
+        '''
+
+        topics = self.record.topics
+
+        if topics is None:
+            topics = self.get_github_repository().get_topics()
+
+        return topics
 
     def get_default_branch(self):
         '''
         Returns the Repository Default Branch
         '''
 
-        return self.github_repository.default_branch
+        return self.record.default_branch
 
-    def branch_exists(self, branch_name):
+    def get_branch_head(self, branch_name):
         '''
-        Checks if a Branch exists on a Repository
+        Returns the head commit SHA of a Branch, False if it does not exist
+        The result is kept for the rest of the run
         '''
 
-        try:
-            self.github_repository.get_branch(branch_name)
+        if branch_name not in self.branch_heads:
+            try:
+                self.branch_heads[branch_name] = \
+                    self.get_github_repository() \
+                    .get_branch(branch_name).commit.sha
 
-            return True
+            except GithubException:
+                self.branch_heads[branch_name] = False
 
-        except GithubException:
-            return False
+        return self.branch_heads[branch_name]
+
+    def has_branch_head(self, branch_name):
+        '''
+        Checks if the head of a Branch is already known
+        '''
+
+        return branch_name in self.branch_heads
+
+    def set_branch_head(self, branch_name, sha):
+        '''
+        Remembers an already known Branch head, False if it does not exist
+        '''
+
+        self.branch_heads[branch_name] = sha
+
+    def branch_exists(self, branch_name):
+        '''
+        Checks if a Branch exists on a Repository
+        '''
+
+        return bool(
+            self.get_branch_head(branch_name)
+        )
 
     def create_branch(self, branch_name):
         '''
         Creating a Branch on a Repository
         '''
 
-        try:
-            self.github_repository.get_branch(branch_name)
-
+        if self.branch_exists(branch_name):
             print(
                 f"   » Branch {Colors.OKBLUE}{branch_name}{Colors.ENDC}"
                 f" already exists on {Colors.OKBLUE}"
-                f"{self.github_repository.full_name}{Colors.ENDC}"
+                f"{self.record.full_name}{Colors.ENDC}"
             )
 
             return True
 
-        except GithubException:
-            print(
-                f"   » Creating new branch {Colors.OKBLUE}{branch_name}"
-                f"{Colors.ENDC} on {self.github_repository.full_name}"
-            )
+        print(
+            f"   » Creating new branch {Colors.OKBLUE}{branch_name}"
+            f"{Colors.ENDC} on {self.record.full_name}"
+        )
 
-            self.github_repository.create_git_ref(
+        head_sha = self.get_branch_head(self.get_default_branch())
+
+        try:
+            self.get_github_repository().create_git_ref(
                 f"refs/heads/{branch_name}",
-                self.github_repository.get_commit('HEAD').sha
+                head_sha
             )
 
-            return False
+        except GithubException as ex:
+            if ex.status != 422:
+                raise
+
+            # Created since it was read, like by an earlier apply of a Plan
+            print(
+                f"   » Branch {Colors.OKBLUE}{branch_name}{Colors.ENDC}"
+                f" was created meanwhile on {Colors.OKBLUE}"
+                f"{self.record.full_name}{Colors.ENDC}"
+            )
+
+            self.branch_heads.pop(branch_name, None)
+            self.branch_prs.pop(branch_name, None)
+
+            return True
+
+        self.branch_heads[branch_name] = head_sha
+
+        return False
 
     def get_branch_pr(self, branch_name):
         '''
         Fetch the PR for Branch
+        The result is kept for the rest of the run
         '''
 
-        prs = self.github_repository.get_pulls(
-            state="open"
-        )
+        if branch_name not in self.branch_prs:
+            self.branch_prs[branch_name] = False
 
-        for pr in prs:
-            if pr.head.ref == branch_name:
-                return pr
+            # Let Github filter on the head Branch
+            owner = self.record.full_name.split('/')[0]
+            prs = self.get_github_repository().get_pulls(
+                state="open",
+                head=f"{owner}:{branch_name}"
+            )
 
-        return False
+            for pr in prs:
+                if pr.head.ref == branch_name:
+                    self.branch_prs[branch_name] = pr
+                    break
+
+        return self.branch_prs[branch_name]
+
+    def set_branch_pr(self, branch_name, number, title=None):
+        '''
+        Remembers an already known PR number for Branch, None if there is
+        no PR. With its title too, the PR is not read
+        '''
+
+        known_pr = self.branch_prs.get(branch_name)
+
+        if known_pr is not None \
+           and (known_pr.number if known_pr else None) == number:
+            return
+
+        if number and title is not None:
+            self.branch_prs[branch_name] = github.PullRequest.PullRequest(
+                self.requester,
+                {},
+                {
+                    'number': number,
+                    'title': title,
+                    'url': f"{self.record.url}/pulls/{number}",
+                    'issue_url': f"{self.record.url}/issues/{number}"
+                },
+                completed=False
+            )
+
+            return
+
+        self.branch_prs[branch_name] = \
+            self.get_github_repository().get_pull(number) if number else False
 
     def has_branch_pr(self, branch_name):
         '''
@@ -113,25 +280,23 @@ class Repository:
         '''
         Create or Update a Pull Request for the Branch
         => Post that PR with Title and Initial Comment
+        Returns the Pull Request
         '''
 
+        if reviewers is None:
+            reviewers = []
+
         if self.has_branch_pr(branch_name):
 
             pr = self.get_branch_pr(
                 branch_name=branch_name
             )
 
-            # Beware, Pull Request ID is not stored under
-            # id property, but under number
-            pull_request_id = pr.number
-
             # If the configured PR title differs, update it
             if pr.title != title:
-                self.github_repository \
-                    .get_issue(pull_request_id) \
-                    .edit(
-                        title=title
-                    )
+                pr.edit(
+                    title=title
+                )
 
             # Check the Reviewers for the PR
             self.setup_review_team(
@@ -141,21 +306,40 @@ class Repository:
 
             # Pushing a message to a Pull Request is using
             # Issue API in GithubAPIv3
-            self.github_repository \
-                .get_issue(pull_request_id) \
-                .create_comment(
-                    body=comment
-                )
+            pr.create_issue_comment(
+                body=comment
+            )
 
-            return True
+            return pr
 
         else:
-            pr = self.github_repository.create_pull(
-                title=title,
-                body=comment,
-                head=branch_name,
-                base=self.github_repository.default_branch
-            )
+            try:
+                pr = self.get_github_repository().create_pull(
+                    title=title,
+                    body=comment,
+                    head=branch_name,
+                    base=self.record.default_branch
+                )
+
+            except GithubException as ex:
+                # Opened since it was read, like by an earlier apply of a Plan
+                self.branch_prs.pop(branch_name, None)
+
+                if ex.status != 422 or not self.has_branch_pr(branch_name):
+                    raise
+
+                return self.create_pr(
+                    branch_name=branch_name,
+                    title=title,
+                    comment=comment,
+                    reviewers=reviewers
+                )
+
+            self.branch_prs[branch_name] = pr
+
+            # A new PR has no review request yet. Beware, Pull Request ID
+            # is not stored under id property, but under number
+            self.review_teams[pr.number] = []
 
             # Check the Reviewers for the PR
             self.setup_review_team(
@@ -163,44 +347,44 @@ class Repository:
                 reviewers=reviewers
             )
 
-            return True
+            return pr
+
+    def get_review_teams(self, pr):
+        '''
+        Returns the slugs of the Teams requested for review on a PR
+        The result is kept for the rest of the run
+        '''
+
+        if pr.number not in self.review_teams:
+            # the Teams are in the Tuple, position 1
+            self.review_teams[pr.number] = [
+                pr_reviewer.slug
+                for pr_reviewer in pr.get_review_requests()[1]
+                if type(pr_reviewer) is Team.Team
+            ]
+
+        return self.review_teams[pr.number]
 
     def setup_review_team(self, pr, reviewers):
         '''
         Assign teams to PR for review action
         '''
 
-        pr_reviewers = []
-        pr_all_reviewers = pr.get_review_requests()
-
-        # the Teams are in the Tuple, position 1
-        for pr_reviewer in pr_all_reviewers[1]:
-            if type(pr_reviewer) is Team.Team:
-                pr_reviewers.append(pr_reviewer.slug)
+        pr_reviewers = self.get_review_teams(pr)
 
         # Does the current reviewer list contain the asked reviewers?
-        reviewer_intersect = [
-            value for value in pr_reviewers
-            if value in reviewers
+        missing_reviewers = [
+            value for value in reviewers
+            if value not in pr_reviewers
         ]
 
-        if reviewer_intersect != reviewers:
+        if missing_reviewers:
+            # Review requests are added to the existing ones
             pr.create_review_request(
-                # concatenate the original list of reviewers
-                team_reviewers=pr_reviewers + reviewers
+                team_reviewers=missing_reviewers
             )
 
-    def file_exists(self, branch_name, path):
-        '''
-        Checks if a file exists on a branch
-        '''
-
-        return bool(
-            self.get_file(
-                branch_name=branch_name,
-                path=path
-            )
-        )
+            pr_reviewers.extend(missing_reviewers)
 
     def get_file(self, path, branch_name=None):
         '''
@@ -208,10 +392,10 @@ class Repository:
         '''
 
         if branch_name is None:
-            branch_name = self.github_repository.default_branch
+            branch_name = self.record.default_branch
 
         try:
-            file = self.github_repository.get_contents(
+            file = self.get_github_repository().get_contents(
                 path=path,
                 ref=branch_name
             )
@@ -221,100 +405,153 @@ class Repository:
         except GithubException:
             return False
 
-    def hash_file(self, path, branch_name=None):
+    def get_directory_blob_shas(self, path, branch_name=None):
         '''
-        Calculates sha256 hash of a repository file
+        Lists a directory on a Branch, once, and returns the blob SHA
+        of each file by path
         '''
 
         if branch_name is None:
-            branch_name = self.github_repository.default_branch
+            branch_name = self.record.default_branch
 
-        file_content = self.get_file(
-            path=path,
-            branch_name=branch_name
-        )
+        if (path, branch_name) not in self.directory_listings:
+            try:
+                contents = self.get_github_repository().get_contents(
+                    path=path,
+                    ref=branch_name
+                )
 
-        if file_content:
-            return hashlib.sha256(
-                file_content.decoded_content
-            ).hexdigest()
+            except GithubException as ex:
+                # Any other error would make every file look missing
+                if ex.status != 404:
+                    raise
 
-        return False
+                contents = []
+
+            if not isinstance(contents, list):
+                contents = [contents]
+
+            self.directory_listings[(path, branch_name)] = {
+                content.path: content.sha
+                for content in contents
+                if content.type == 'file'
+            }
 
-    def put_file(self, branch_name, path, to_path, commit_text_tpl=None):
+        return self.directory_listings[(path, branch_name)]
+
+    def has_directory_blob_shas(self, path, branch_name):
         '''
-        Copy a local file to a specific Branch on a specitic to_path
+        Checks if a directory was already listed on a Branch
         '''
 
-        try:
-            if commit_text_tpl is None:
-                commit_text = f"Updating {os.path.basename(path)}"
+        return (path, branch_name) in self.directory_listings
+
+    def set_directory_blob_shas(self, path, branch_name, blob_shas):
+        '''
+        Remembers an already known directory listing, by file path
+        '''
+
+        self.directory_listings[(path, branch_name)] = blob_shas
+
+    def get_api_url(self):
+        '''
+        Returns the Github API URL of the Repository
+        '''
+
+        return self.record.url
+
+    def get_file_blob_sha(self, path, branch_name=None):
+        '''
+        Returns the blob SHA of a repository file from its directory listing
+        '''
+
+        return self.get_directory_blob_shas(
+            path=os.path.dirname(path),
+            branch_name=branch_name
+        ).get(path, False)
+
+    def put_files(self, branch_name, files, commit_text_tpl=None):
+        '''
+        Commit contents to a specific Branch in a single commit
+        files maps each to_path to its content
+        '''
+
+        basenames = ', '.join(
+            os.path.basename(to_path) for to_path in files
+        )
 
-            else:
-                commit_text = commit_text_tpl.replace(
-                    '{file}',
-                    os.path.basename(path)
+        if commit_text_tpl is None:
+            commit_text = f"Updating {basenames}"
+
+        else:
+            commit_text = commit_text_tpl.replace('{file}', basenames)
+
+        tree_elements = []
+
+        for to_path, content in files.items():
+            # Blobs are created along with the tree
+            tree_elements.append(
+                InputGitTreeElement(
+                    path=to_path,
+                    mode='100644',
+                    type='blob',
+                    content=content
                 )
+            )
 
-            if os.path.isfile(path):
-                # Get the content of the original Workflow file
-                with open(path, 'r', encoding='UTF-8') as file:
-                    file_content = file.read()
-
-                    # If the file exists, we want to update it
-                    # instead of creating
-                    if self.file_exists(
-                        branch_name=branch_name,
-                        path=to_path
-                    ):
-                        print(
-                            f"   » Updating {path} in "
-                            f"{self.github_repository.full_name}:{to_path}"
-                        )
-
-                        # We need the SHA of the previous file
-                        # to do the commit
-                        file = self.get_file(
-                            branch_name=branch_name,
-                            path=to_path
-                        )
-
-                        self.github_repository.update_file(
-                            path=to_path,
-                            message=commit_text,
-                            content=file_content,
-                            branch=branch_name,
-                            sha=file.sha
-                        )
-
-                    else:
-                        print(
-                            f"   » Copying {path} to "
-                            f"{self.github_repository.full_name}:{to_path}"
-                        )
-
-                        # Create the file in the branch
-                        self.github_repository.create_file(
-                            path=to_path,
-                            message=commit_text,
-                            content=file_content,
-                            branch=branch_name
-                        )
+            # The directory listing of the Branch will be outdated
+            self.directory_listings.pop(
+                (os.path.dirname(to_path), branch_name),
+                None
+            )
 
-                return True
+        github_repository = self.get_github_repository()
+
+        try:
+            # The head is known from the Branch creation or the diff, only
+            # its tree is read
+            head = github_repository.get_git_commit(
+                self.get_branch_head(branch_name)
+            )
+            tree = github_repository.create_git_tree(
+                tree=tree_elements,
+                base_tree=head.tree
+            )
+
+            self.branch_heads[branch_name] = head.sha
 
-            else:
-                Common.github_output(
-                    'error',
-                    f"Cannot copy Workflow {path} : file not found"
+            if tree.sha == head.tree.sha:
+                print(
+                    f"   » Files already up to date on "
+                    f"{self.record.full_name}:{branch_name}"
                 )
 
-                return False
+                return True
+
+            print(
+                f"   » Committing {basenames} to "
+                f"{self.record.full_name}:{branch_name}"
+            )
+
+            commit = github_repository.create_git_commit(
+                message=commit_text,
+                tree=tree,
+                parents=[head]
+            )
+            # Not forced, a Branch moved since its head was read is refused
+            self.requester.requestJsonAndCheck(
+                'PATCH',
+                f"{self.get_api_url()}/git/refs/heads/{branch_name}",
+                input={'sha': commit.sha, 'force': False}
+            )
+            self.branch_heads[branch_name] = commit.sha
+
+            return True
 
         except GithubException as ex:
             Common.github_output(
                 'error',
-                f"An error occured during file copy: {str(ex)}"
+                f"An error occured during files commit: {str(ex)}"
             )
 
             return False
@@ -0,0 +1,113 @@
+"""
+Repository Metadata Prefilter for the Workflow Spreader
+"""
+
+import os
+from fnmatch import fnmatchcase
+
+
+class RepositoryFilter:
+    '''
+    Skips the Repositories that can not, or should not, receive Workflows.
+    Only the metadata of the Organization listing is used, so that skipped
+    Repositories cost no request.
+    '''
+
+    rules = ('archived', 'disabled', 'empty', 'fork')
+    # Forks and empty Repositories may hold Configurations, skipping them is
+    # opt-in
+    default_skip = ('archived', 'disabled')
+
+    def __init__(
+            self, skip=default_skip, visibilities=None, include=None,
+            exclude=None):
+        '''
+        RepositoryFilter Constructor
+        skip are the rules skipping Repositories, visibilities the accepted
+        visibilities, include and exclude name globs
+        '''
+
+        unknown_rules = set(skip) - set(RepositoryFilter.rules)
+
+        if unknown_rules:
+            raise ValueError(
+                f"Unknown Repository filter rules {', '.join(unknown_rules)}"
+            )
+
+        self.skip = tuple(skip)
+        self.visibilities = tuple(visibilities) if visibilities else ()
+        self.include = tuple(glob.lower() for glob in include or ())
+        self.exclude = tuple(glob.lower() for glob in exclude or ())
+
+    def from_env():
+        '''
+        Builds the RepositoryFilter from the environment
+        '''
+
+        def get_list(name, default=''):
+            '''
+            Reads a comma-separated environment variable
+            '''
+
+            return [
+                value.strip()
+                for value in os.getenv(name, default).split(',')
+                if value.strip()
+            ]
+
+        return RepositoryFilter(
+            skip=get_list(
+                'SPREADER_SKIP',
+                ','.join(RepositoryFilter.default_skip)
+            ),
+            visibilities=get_list('SPREADER_VISIBILITY'),
+            include=get_list('SPREADER_INCLUDE'),
+            exclude=get_list('SPREADER_EXCLUDE')
+        )
+
+    def is_empty(metadata):
+        '''
+        Tells if a Repository has no commit
+        The size is updated lazily by Github, so a size of 0 alone does not
+        make a Repository empty, it must also never have been pushed to
+        '''
+
+        if not metadata.get('default_branch'):
+            return True
+
+        return metadata.get('size') == 0 and (
+            not metadata.get('pushed_at')
+            or metadata.get('pushed_at') == metadata.get('created_at')
+        )
+
+    def get_skip_reason(self, repository_name, metadata):
+        '''
+        Returns why a Repository is skipped, None if it is not
+        '''
+
+        for rule in self.skip:
+            if rule == 'empty':
+                if RepositoryFilter.is_empty(metadata):
+                    return rule
+
+            elif metadata.get(rule):
+                return rule
+
+        if self.visibilities:
+            visibility = metadata.get('visibility') or (
+                'private' if metadata.get('private') else 'public'
+            )
+
+            if visibility not in self.visibilities:
+                return 'visibility'
+
+        name = repository_name.lower()
+
+        if self.include \
+           and not any(fnmatchcase(name, glob) for glob in self.include):
+            return 'name'
+
+        if any(fnmatchcase(name, glob) for glob in self.exclude):
+            return 'name'
+
+        return None
@@ -0,0 +1,485 @@
+"""
+Webhook Server keeping the Workflow Spreader running
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ..Colors import Colors
+from ..Common import Common
+from .AsyncTransport import AsyncTransport
+from .ChangeSet import ChangeSet
+from .Configuration import Configuration
+from .Metrics import Metrics
+from .Propagator import Propagator
+from .RefState import RefState
+from .WorkflowCatalog import WorkflowCatalog
+
+
+class Server:
+    '''
+    Keeps the Repository index, the discovered Configurations and the
+    Workflow catalog in memory, and spreads again what Github push webhooks
+    affect:
+    - a push to the Spreader Repository spreads the changed Workflows and
+      local Configurations, once the local checkout is pulled
+    - a push to the default Branch of another Repository discovers its
+      Configuration again and spreads its Workflows
+    Events are debounced, so that a burst of pushes is spread at once.
+    '''
+
+    listen = os.getenv('SPREADER_LISTEN', '127.0.0.1:8080')
+    # Seconds without event before the pending events are spread
+    debounce = float(os.getenv('SPREADER_DEBOUNCE', '10'))
+    secret = os.getenv('SPREADER_WEBHOOK_SECRET', '')
+    repository = os.getenv(
+        'SPREADER_REPOSITORY',
+        os.getenv('GITHUB_REPOSITORY', '')
+    )
+    max_payload_size = 25 * 1024 * 1024
+
+    def __init__(self, organization, catalog, state_store=None):
+        '''
+        Server Constructor
+        '''
+
+        self.organization = organization
+        self.catalog = catalog
+        self.state_store = state_store
+        self.configurations = {}
+        self.pending_repositories = set()
+        self.pending_commits = None
+        self.pending_lock = threading.Lock()
+        self.spread_lock = threading.Lock()
+        self.timer = None
+        self.started_at = time.time()
+        self.spreads = 0
+        self.last_spread = None
+        self.last_error = None
+
+    def remember(self, configurations):
+        '''
+        Keeps the Configurations in memory as they are found
+        '''
+
+        for config in configurations:
+            self.configurations[config.repository_name.lower()] = config
+
+            yield config
+
+    def discover(self, repository_names=None):
+        '''
+        Discovers the Configurations of all Repositories, or only of those
+        named, replacing those in memory
+        '''
+
+        if repository_names is None:
+            self.configurations = {}
+
+        else:
+            for repository_name in repository_names:
+                self.configurations.pop(repository_name.lower(), None)
+
+        return self.remember(self.catalog.check_configurations(
+            Configuration.find_configurations(
+                organization=self.organization,
+                state_store=self.state_store,
+                repository_names=repository_names
+            )
+        ))
+
+    def forget(self, configurations):
+        '''
+        Drops what the Repositories of the Configurations cached during the
+        previous spreads, as they were pushed to meanwhile
+        '''
+
+        for config in configurations:
+            repository = self.organization.repositories.get(
+                config.repository_name.lower()
+            )
+
+            if repository is not None:
+                repository.clear_caches()
+
+            yield config
+
+    def propagate(self, configurations):
+        '''
+        Propagates the Workflows of the Configurations, and records the
+        outcome for the health endpoint
+        '''
+
+        propagator = Propagator(
+            organization=self.organization,
+            catalog=self.catalog,
+            state_store=self.state_store
+        )
+
+        configurations = self.forget(configurations)
+
+        if RefState.backend == 'graphql':
+            configurations = RefState.prefetch(
+                organization=self.organization,
+                configurations=configurations
+            )
+
+        transport = AsyncTransport.get_instance()
+
+        if transport is not None:
+            configurations = transport.prefetch(
+                organization=self.organization,
+                catalog=self.catalog,
+                configurations=configurations,
+                state_store=self.state_store
+            )
+
+        propagator.propagate(configurations)
+        propagator.report.print_summary()
+
+        if self.state_store:
+            self.state_store.commit()
+
+        self.spreads += 1
+        self.last_spread = {
+            'time': round(time.time()),
+            'summary': propagator.report.get_summary()
+        }
+
+    def update_catalog(self, base, head):
+        '''
+        Pulls the Spreader Repository and reloads the Workflow catalog
+        Returns the ChangeSet between both commits, None for a full sweep
+        '''
+
+        subprocess.run(
+            ['git', 'pull', '--ff-only'],
+            capture_output=True,
+            check=True,
+            text=True
+        )
+
+        self.catalog = WorkflowCatalog()
+        Configuration.default_configuration_loaded = False
+
+        return ChangeSet.from_git(base=base, head=head)
+
+    def requeue(self, repository_names, commits):
+        '''
+        Puts back the events of a spread that did not complete, ahead of
+        those received meanwhile
+        '''
+
+        with self.pending_lock:
+            self.pending_repositories |= repository_names
+
+            if commits:
+                self.pending_commits = (
+                    commits[0],
+                    self.pending_commits[1] if self.pending_commits
+                    else commits[1]
+                )
+
+    def spread_pending(self):
+        '''
+        Spreads what the pending events affect
+        The events are kept for the next tick if the spread fails
+        '''
+
+        with self.spread_lock:
+            with self.pending_lock:
+                repository_names = set(self.pending_repositories)
+                commits = self.pending_commits
+                self.pending_repositories = set()
+                self.pending_commits = None
+
+            try:
+                self.spread(repository_names, commits)
+
+            except Exception as ex:  # pylint: disable=broad-except
+                Common.github_output(
+                    'error',
+                    f"Could not spread the pending events: {str(ex)}"
+                )
+
+                self.last_error = {
+                    'time': round(time.time()),
+                    'message': str(ex)
+                }
+                self.requeue(repository_names, commits)
+                self.schedule()
+
+    def spread(self, repository_names, commits):
+        '''
+        Spreads what the pushes to the Repositories and the Spreader commits
+        affect
+        '''
+
+        configurations = {}
+
+        print(
+            f"\n{Colors.BOLD}Spreading "
+            f"{'Spreader changes and ' if commits else ''}"
+            f"{len(repository_names)} pushed Repositories"
+            f"{Colors.ENDC}"
+        )
+
+        for repository_name in repository_names:
+            self.organization.refresh_repo(repository_name)
+
+        if commits:
+            try:
+                change_set = self.update_catalog(*commits)
+
+            except (OSError, subprocess.CalledProcessError) as ex:
+                Common.github_output(
+                    'error',
+                    f"Could not pull the Spreader Repository: {str(ex)}"
+                )
+
+                # Keeps the base commit, the next event pulls again
+                self.last_error = {
+                    'time': round(time.time()),
+                    'message': str(ex)
+                }
+                self.requeue(set(), commits)
+                change_set = ChangeSet(workflows=[], repositories=[])
+
+            if change_set is None:
+                self.propagate(self.discover())
+
+                return
+
+            repository_names = repository_names | change_set.repositories
+
+            for config in change_set.filter_configurations(
+                list(self.configurations.values())
+            ):
+                configurations[config.repository_name.lower()] = config
+
+        if repository_names:
+            for config in self.discover(sorted(repository_names)):
+                configurations[config.repository_name.lower()] = config
+
+        if configurations:
+            self.propagate(list(configurations.values()))
+
+    def schedule(self):
+        '''
+        Spreads the pending events once no event came for debounce seconds
+        '''
+
+        with self.pending_lock:
+            if self.timer is not None:
+                self.timer.cancel()
+
+            self.timer = threading.Timer(
+                Server.debounce,
+                self.spread_pending
+            )
+            self.timer.daemon = True
+            self.timer.start()
+
+    def receive(self, event, payload):
+        '''
+        Queues what a webhook event affects
+        Returns False if the event is ignored
+        '''
+
+        if event != 'push' or payload.get('deleted'):
+            return False
+
+        repository = payload['repository']
+
+        # Only the default Branch holds Configurations, the other pushes are
+        # also those of the Spreader on its incoming Branches
+        if payload['ref'] != \
+           f"refs/heads/{repository.get('default_branch')}":
+            return False
+
+        with self.pending_lock:
+            if repository['full_name'].lower() == Server.repository.lower():
+                self.pending_commits = (
+                    self.pending_commits[0] if self.pending_commits
+                    else payload['before'],
+                    payload['after']
+                )
+
+            elif repository['owner']['login'].lower() == \
+                    self.organization.get_name().lower():
+                self.pending_repositories.add(repository['name'])
+
+            else:
+                return False
+
+        self.schedule()
+
+        return True
+
+    def is_signed(self, body, signature):
+        '''
+        Checks the webhook signature when a secret is set
+        '''
+
+        if not Server.secret:
+            return True
+
+        expected = 'sha256=' + hmac.new(
+            Server.secret.encode('utf-8'),
+            body,
+            hashlib.sha256
+        ).hexdigest()
+
+        return hmac.compare_digest(expected, signature or '')
+
+    def get_health(self):
+        '''
+        Returns the state of the Server
+        '''
+
+        with self.pending_lock:
+            pending = len(self.pending_repositories) \
+                + (1 if self.pending_commits else 0)
+
+        return {
+            'status': 'ok',
+            'uptime': round(time.time() - self.started_at),
+            'repositories': len(self.organization.repositories),
+            'configurations': len(self.configurations),
+            'pending': pending,
+            'spreads': self.spreads,
+            'last_spread': self.last_spread,
+            'last_error': self.last_error
+        }
+
+    def get_handler(self):
+        '''
+        Returns the request handler class of the HTTP server
+        '''
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def send(self, status, body, content_type='application/json'):
+                '''
+                Sends a response, body is encoded as JSON unless another
+                content type is given
+                '''
+
+                if content_type == 'application/json':
+                    body = json.dumps(body)
+
+                body = body.encode('utf-8')
+
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                '''
+                Serves the health and metrics endpoints
+                '''
+
+                if self.path == '/health':
+                    self.send(200, server.get_health())
+
+                elif self.path == '/metrics':
+                    self.send(
+                        200,
+                        Metrics.get_instance().get_prometheus(),
+                        'text/plain; version=0.0.4'
+                    )
+
+                else:
+                    self.send(404, {'message': 'Not Found'})
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                '''
+                Checks and queues a webhook event
+                '''
+
+                if self.path != '/webhook':
+                    self.send(404, {'message': 'Not Found'})
+                    return
+
+                length = int(self.headers.get('Content-Length') or 0)
+
+                if length > Server.max_payload_size:
+                    self.send(413, {'message': 'Payload Too Large'})
+                    return
+
+                body = self.rfile.read(length)
+
+                if not server.is_signed(
+                    body,
+                    self.headers.get('X-Hub-Signature-256')
+                ):
+                    self.send(401, {'message': 'Bad Signature'})
+                    return
+
+                try:
+                    payload = json.loads(body)
+                    queued = server.receive(
+                        self.headers.get('X-GitHub-Event', ''),
+                        payload
+                    )
+
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    self.send(400, {'message': 'Bad Payload'})
+                    return
+
+                self.send(202 if queued else 200, {'queued': queued})
+
+        return Handler
+
+    def serve(self, listen=None):
+        '''
+        Listens for webhooks, spreads every Configuration, then spreads the
+        webhook events until interrupted
+        The events received during the first spread are spread after it
+        '''
+
+        host, _, port = (listen or Server.listen).rpartition(':')
+
+        httpd = ThreadingHTTPServer(
+            (host or '127.0.0.1', int(port)),
+            self.get_handler()
+        )
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+
+        print(
+            f"\n{Colors.BOLD}Listening for webhooks on "
+            f"{host or '127.0.0.1'}:{port} ...{Colors.ENDC}"
+        )
+
+        try:
+            with self.spread_lock:
+                self.propagate(self.discover())
+
+            while thread.is_alive():
+                thread.join(1)
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+            with self.pending_lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+
+            # Lets a running spread end
+            with self.spread_lock:
+                pass
@@ -0,0 +1,43 @@
+"""
+Deterministic Sharding of Repositories across parallel jobs
+"""
+
+import hashlib
+
+
+class Shard:
+
+    def __init__(self, index, count):
+        '''
+        Shard Constructor
+        '''
+
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(
+                f"Invalid shard {index} of {count}"
+            )
+
+        self.index = index
+        self.count = count
+
+    def contains(self, repository_name):
+        '''
+        Checks if a Repository belongs to the Shard, by a stable hash of
+        its name
+        '''
+
+        digest = hashlib.sha1(
+            repository_name.lower().encode('utf-8')
+        ).hexdigest()
+
+        return int(digest, 16) % self.count == self.index
+
+    def to_dict(self):
+        '''
+        Serializes the Shard, for the Report
+        '''
+
+        return {
+            'index': self.index,
+            'count': self.count
+        }
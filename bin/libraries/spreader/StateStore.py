@@ -0,0 +1,196 @@
+"""
+Local State of the last propagated Workflows
+"""
+
+import os
+import sqlite3
+import threading
+
+
+class StateStore:
+    '''
+    SQLite database remembering, for each Repository, Workflow and Branch,
+    the blob SHA that was last seen up to date, the Branch head at that time
+    and the Pull Request number.
+    It also remembers the Configuration file found on each Repository, valid
+    until the Repository is pushed again
+    '''
+
+    path = os.getenv('SPREADER_STATE_DB', '')
+    # Repositories processed between two saves of the database
+    commit_interval = int(os.getenv('SPREADER_STATE_COMMIT_INTERVAL', '50'))
+
+    def __init__(self, path, full_resync=False):
+        '''
+        StateStore Constructor
+        With full_resync, stored states are ignored and rebuilt
+        '''
+
+        self.full_resync = full_resync
+        self.lock = threading.Lock()
+        self.processed = 0
+
+        directory = os.path.dirname(path)
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS states ("
+            " repository TEXT NOT NULL,"
+            " workflow TEXT NOT NULL,"
+            " branch TEXT NOT NULL,"
+            " blob_sha TEXT NOT NULL,"
+            " head_sha TEXT NOT NULL,"
+            " pr_number INTEGER,"
+            " PRIMARY KEY (repository, workflow, branch)"
+            ")"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS discoveries ("
+            " repository TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " pushed_at TEXT NOT NULL,"
+            " head_sha TEXT,"
+            " content TEXT,"
+            " PRIMARY KEY (repository, path)"
+            ")"
+        )
+
+    def open(full_resync=False):
+        '''
+        Returns the StateStore, None if it is disabled
+        '''
+
+        if not StateStore.path:
+            return None
+
+        return StateStore(
+            path=StateStore.path,
+            full_resync=full_resync
+        )
+
+    def get(self, repository, workflow, branch):
+        '''
+        Returns the stored state as a dict, None if unknown
+        '''
+
+        if self.full_resync:
+            return None
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT blob_sha, head_sha, pr_number FROM states"
+                " WHERE repository = ? AND workflow = ? AND branch = ?",
+                (repository.lower(), workflow, branch)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'blob_sha': row[0],
+            'head_sha': row[1],
+            'pr_number': row[2]
+        }
+
+    def is_up_to_date(  # pylint: disable=too-many-arguments
+            self, repository, workflow, branch, blob_sha, head_sha):
+        '''
+        Checks if a Workflow is known to be up to date on a Branch head
+        '''
+
+        state = self.get(repository, workflow, branch)
+
+        return state is not None \
+            and state['blob_sha'] == blob_sha \
+            and state['head_sha'] == head_sha
+
+    def set(  # pylint: disable=too-many-arguments
+            self, repository, workflow, branch, blob_sha, head_sha,
+            pr_number=None):
+        '''
+        Stores the state of a Workflow on a Branch
+        '''
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO states"
+                " (repository, workflow, branch, blob_sha, head_sha,"
+                " pr_number) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    repository.lower(), workflow, branch, blob_sha,
+                    head_sha, pr_number
+                )
+            )
+
+    def get_discovery(self, repository, path, pushed_at):
+        '''
+        Returns the Configuration file found on a Repository as a dict of the
+        default Branch head and content, content being None if there was no
+        file. None if unknown or if the Repository was pushed since
+        '''
+
+        if self.full_resync:
+            return None
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT head_sha, content FROM discoveries"
+                " WHERE repository = ? AND path = ? AND pushed_at = ?",
+                (repository.lower(), path, pushed_at)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'head_sha': row[0],
+            'content': row[1]
+        }
+
+    def set_discovery(  # pylint: disable=too-many-arguments
+            self, repository, path, pushed_at, head_sha, content):
+        '''
+        Stores the Configuration file found on a Repository, None if absent
+        '''
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO discoveries"
+                " (repository, path, pushed_at, head_sha, content)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (repository.lower(), path, pushed_at, head_sha, content)
+            )
+
+    def checkpoint(self):
+        '''
+        Counts a processed Repository, and saves the database every
+        commit_interval Repositories so that an interrupted run keeps most
+        of its states
+        '''
+
+        with self.lock:
+            self.processed += 1
+
+            if StateStore.commit_interval > 0 \
+               and self.processed % StateStore.commit_interval == 0:
+                self.connection.commit()
+
+    def commit(self):
+        '''
+        Saves the database, for processes that keep it open
+        '''
+
+        with self.lock:
+            self.connection.commit()
+
+    def close(self):
+        '''
+        Saves and closes the database
+        '''
+
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
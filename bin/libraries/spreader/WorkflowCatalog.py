@@ -0,0 +1,203 @@
+"""
+Catalog of the Workflows available for spreading
+"""
+
+import hashlib
+import os
+import re
+import threading
+
+from ..Common import Common
+
+
+class Workflow:  # pylint: disable=too-few-public-methods
+    '''
+    A local Workflow with its content and hashes
+    A Workflow using {var:name} tags is a template, parsed once into its
+    literal parts and the variable names between them
+    '''
+
+    variable_pattern = re.compile(rb'\{var:([A-Za-z0-9_-]+)\}')
+
+    def __init__(self, name, path, content):
+        '''
+        Workflow Constructor
+        '''
+
+        self.name = name
+        self.path = path
+        self.content = content
+        self.sha256 = hashlib.sha256(content).hexdigest()
+        self.blob_sha = Common.git_blob_sha(content)
+        self.destination = f".github/workflows/{os.path.basename(name)}.yml"
+        # Literal parts at even indexes, variable names at odd ones
+        self.parts = Workflow.variable_pattern.split(content)
+        self.variables = frozenset(
+            part.decode('utf-8') for part in self.parts[1::2]
+        )
+
+    def render(self, variables):
+        '''
+        Returns the Workflow with its tags replaced by the variables
+        '''
+
+        return Workflow(
+            name=self.name,
+            path=self.path,
+            content=b''.join(
+                part if index % 2 == 0
+                else variables[part.decode('utf-8')].encode('utf-8')
+                for index, part in enumerate(self.parts)
+            )
+        )
+
+
+class WorkflowCatalog:
+    workflows_path = './workflows'
+
+    def __init__(self, path=None):
+        '''
+        WorkflowCatalog Constructor, reads and hashes every Workflow once
+        '''
+
+        self.path = path if path else WorkflowCatalog.workflows_path
+        self.workflows = {}
+        # Rendered Workflows by name and used variables, shared by the
+        # Repositories with the same values
+        self.renders = {}
+        self.renders_lock = threading.Lock()
+
+        for root, _, filenames in os.walk(self.path):
+            for filename in sorted(filenames):
+                if not filename.endswith('.yml'):
+                    continue
+
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.path)[:-len('.yml')] \
+                    .replace(os.sep, '/')
+
+                with open(path, 'r', encoding='UTF-8') as file:
+                    content = file.read().encode('utf-8')
+
+                self.workflows[name] = Workflow(
+                    name=name,
+                    path=f"{self.path}/{name}.yml",
+                    content=content
+                )
+
+        for destination, names in self.get_collisions().items():
+            Common.github_output(
+                'error',
+                f"Workflows {', '.join(names)} are all spread to "
+                f"{destination}, a Configuration using several of them "
+                "overwrites one with another"
+            )
+
+    def get_collisions(self):
+        '''
+        Returns the Workflow names by destination, for the destinations
+        shared by several Workflows of different directories
+        '''
+
+        names = {}
+
+        for name, workflow in sorted(self.workflows.items()):
+            names.setdefault(workflow.destination, []).append(name)
+
+        return {
+            destination: destination_names
+            for destination, destination_names in names.items()
+            if len(destination_names) > 1
+        }
+
+    def get(self, name, variables=None):
+        '''
+        Returns a Workflow by name, rendered with variables if it is a
+        template. None if unknown or if a variable is missing
+        '''
+
+        workflow = self.workflows.get(name)
+
+        if workflow is None or not workflow.variables:
+            return workflow
+
+        variables = variables if variables else {}
+
+        if not workflow.variables.issubset(variables):
+            return None
+
+        key = (
+            name,
+            frozenset(
+                (variable, variables[variable])
+                for variable in workflow.variables
+            )
+        )
+
+        with self.renders_lock:
+            rendered = self.renders.get(key)
+
+        if rendered is None:
+            rendered = workflow.render(variables)
+
+            with self.renders_lock:
+                rendered = self.renders.setdefault(key, rendered)
+
+        return rendered
+
+    def get_unknown_workflows(self, config):
+        '''
+        Returns the Workflow names of a Configuration missing in the Catalog
+        '''
+
+        return [
+            name for name in config.data.get('workflows', [])
+            if name not in self.workflows
+        ]
+
+    def get_missing_variables(self, config):
+        '''
+        Returns the variables used by the Workflows of a Configuration that
+        it does not define
+        '''
+
+        variables = config.data.get('variables', {})
+
+        return sorted({
+            variable
+            for name in config.data.get('workflows', [])
+            if name in self.workflows
+            for variable in self.workflows[name].variables
+            if variable not in variables
+        })
+
+    def check_configurations(self, configurations):
+        '''
+        Reports the unknown Workflows and missing variables of each
+        Configuration before it is propagated
+        Yields the Configurations, as they come
+        '''
+
+        for config in configurations:
+            unknown_workflows = self.get_unknown_workflows(config)
+
+            if unknown_workflows:
+                Common.github_output(
+                    'error',
+                    f"Workflow Configuration {config.path} of "
+                    f"{config.repository_name} references unknown "
+                    f"Workflows: {', '.join(unknown_workflows)}"
+                )
+
+            missing_variables = self.get_missing_variables(config)
+
+            if missing_variables:
+                Common.github_output(
+                    'error',
+                    f"Workflow Configuration {config.path} of "
+                    f"{config.repository_name} misses the variables "
+                    f"{', '.join(missing_variables)}, the Workflows using "
+                    "them are not spread"
+                )
+
+            yield config
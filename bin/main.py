@@ -3,12 +3,26 @@ Github Workflow Importer
 __author__ Pierre PATAKI <ppataki __AT__ sdv.fr>
 """
 
+import argparse
 import os
+import sys
 
 from libraries.Colors import Colors
-from libraries.Common import Common
+from libraries.spreader.AsyncTransport import AsyncTransport
+from libraries.spreader.ChangeSet import ChangeSet
 from libraries.spreader.Configuration import Configuration
+from libraries.spreader.Metrics import Metrics
 from libraries.spreader.Organization import Organization
+from libraries.spreader.Plan import Plan
+from libraries.spreader.Propagator import Propagator
+from libraries.spreader.RateLimiter import RateLimiter
+from libraries.spreader.RefState import RefState
+from libraries.spreader.Report import Report
+from libraries.spreader.RepositoryFilter import RepositoryFilter
+from libraries.spreader.Server import Server
+from libraries.spreader.Shard import Shard
+from libraries.spreader.StateStore import StateStore
+from libraries.spreader.WorkflowCatalog import WorkflowCatalog
 
 # Rock'n'roll
 if __name__ == "__main__":
@@ -16,88 +30,168 @@ if __name__ == "__main__":
     Propagates the Workflow Configurations
     '''
 
-    org = Organization()
-    configurations = Configuration.find_configurations(
-        organization=org
+    parser = argparse.ArgumentParser(
+        description='Spreads the Workflows across the Organization'
     )
-
-    print(
-        f"\n{Colors.BOLD}"
-        f"Propagating Workflows to "
-        f"{str(len(configurations))} Repositories ..."
-        f"{Colors.ENDC}"
+    parser.add_argument(
+        'command',
+        nargs='?',
+        default='spread',
+        choices=['spread', 'plan', 'apply', 'merge-reports', 'serve'],
+        help='spread plans and applies at once, plan only writes the Plan '
+        'file, apply runs a Plan file, merge-reports combines shard Reports, '
+        'serve spreads again on push webhooks'
+    )
+    parser.add_argument(
+        'reports',
+        nargs='*',
+        help='Report files combined by merge-reports'
+    )
+    parser.add_argument(
+        '--plan-file',
+        default='plan.json',
+        help='Plan file written by plan and read by apply'
+    )
+    parser.add_argument(
+        '--since',
+        default=os.getenv('SPREADER_SINCE', ''),
+        help='Only spread the Workflows changed since this commit'
+    )
+    parser.add_argument(
+        '--full-resync',
+        action='store_true',
+        help='Ignore the stored state and check every Repository again'
+    )
+    parser.add_argument(
+        '--shard-index',
+        type=int,
+        default=int(os.getenv('SPREADER_SHARD_INDEX', '0')),
+        help='Index of the Repository shard handled by this job'
+    )
+    parser.add_argument(
+        '--shard-count',
+        type=int,
+        default=int(os.getenv('SPREADER_SHARD_COUNT', '1')),
+        help='Number of jobs the Repositories are spread across'
+    )
+    parser.add_argument(
+        '--report-file',
+        default=os.getenv('SPREADER_REPORT', ''),
+        help='Writes the run Report as JSON to this file'
+    )
+    parser.add_argument(
+        '--listen',
+        default=Server.listen,
+        help='Address and port the serve webhook endpoint listens on'
     )
+    args = parser.parse_args()
 
-    for config in configurations:
-        repository = org.get_repo(config.repository_name)
-        workflows = []
+    if args.command == 'merge-reports':
+        report = Report.merge(
+            [Report.load(path) for path in args.reports]
+        )
+        report.print_summary()
+
+        if args.report_file:
+            report.save(args.report_file)
+
+        sys.exit(1 if report.get_summary()['failed'] else 0)
+
+    catalog = WorkflowCatalog()
 
-        print(
-            f" » {Colors.OKCYAN}{repository.get_full_name()}{Colors.ENDC}"
+    with Metrics.tag(phase='discovery'):
+        org = Organization()
+
+    org.set_repository_filter(RepositoryFilter.from_env())
+
+    if args.shard_count > 1:
+        org.set_shard(
+            Shard(
+                index=args.shard_index,
+                count=args.shard_count
+            )
         )
 
-        for workflow in config.data['workflows']:
-            source_workflow_filename = f"./workflows/{workflow}.yml"
-            dest_workflow_filename = f".github/workflows/" \
-                f"{os.path.basename(workflow)}.yml"
-
-            if repository.branch_exists(
-                config.data['incoming-changes']['branch-name']
-            ):
-                check_branch = config.data['incoming-changes']['branch-name']
-            else:
-                check_branch = repository.get_default_branch()
-
-            if not Common.diff_local_and_repo_files(
-                repository=repository,
-                branch_name=check_branch,
-                local_file=source_workflow_filename,
-                remote_file=dest_workflow_filename
-            ):
-                print(
-                    f"   » File "
-                    f"{Colors.OKBLUE}{source_workflow_filename}{Colors.ENDC}"
-                    f" unchanged. Skipping file."
-                )
-
-            else:
-                print(
-                    f"   » File "
-                    f"{Colors.OKBLUE}{source_workflow_filename}{Colors.ENDC}"
-                    f" updated. Added to update list."
-                )
-
-                workflows.append(workflow)
-
-        if len(workflows) > 0:
-            repository.create_branch(
-                config.data['incoming-changes']['branch-name']
+    state_store = StateStore.open(full_resync=args.full_resync)
+    propagator = Propagator(
+        organization=org,
+        catalog=catalog,
+        state_store=state_store
+    )
+
+    if args.command == 'serve':
+        Server(
+            organization=org,
+            catalog=catalog,
+            state_store=state_store
+        ).serve(args.listen)
+
+    elif args.command == 'apply':
+        plan = Plan.load(args.plan_file)
+        plan.print_summary()
+        propagator.apply(plan)
+
+    else:
+        configurations = catalog.check_configurations(
+            Configuration.find_configurations(
+                organization=org,
+                state_store=state_store
+            )
+        )
+
+        change_set = ChangeSet.from_git(base=args.since)
+
+        if change_set is not None:
+            configurations = change_set.filter_configurations(configurations)
+
+            print(
+                f"\n{Colors.BOLD}Incremental spread since {args.since}: "
+                f"{len(change_set.workflows)} changed Workflows"
+                f"{Colors.ENDC}"
+            )
+
+        if RefState.backend == 'graphql':
+            configurations = RefState.prefetch(
+                organization=org,
+                configurations=configurations
             )
 
-            for workflow in workflows:
-                source_workflow_filename = f"./workflows/{workflow}.yml"
-                dest_workflow_filename = f".github/workflows/" \
-                    f"{os.path.basename(workflow)}.yml"
-
-                repository.put_file(
-                    config.data['incoming-changes']['branch-name'],
-                    source_workflow_filename,
-                    dest_workflow_filename,
-                    config.data['incoming-changes']['commit-name']
-                )
-
-            pr_create_result = repository.create_pr(
-                branch_name=config.data['incoming-changes']['branch-name'],
-                title=config.data['incoming-changes']['pull-request']['title'],
-                comment='Workflow Automatic Update trigger',
-                reviewers=(
-                    config.data['reviewers'] if 'reviewers' in config.data
-                    else []
-                )
+        transport = AsyncTransport.get_instance()
+
+        if transport is not None:
+            configurations = transport.prefetch(
+                organization=org,
+                catalog=catalog,
+                configurations=configurations,
+                state_store=state_store
             )
 
-            if not pr_create_result:
-                Common.github_output(
-                    'error',
-                    "Could not create Pull Request"
-                )
+        if args.command == 'plan':
+            plan = propagator.plan(configurations)
+            plan.save(args.plan_file)
+            plan.print_summary()
+
+        else:
+            propagator.propagate(configurations)
+
+    if state_store:
+        state_store.close()
+
+    if AsyncTransport.instance is not None:
+        AsyncTransport.instance.close()
+
+    if args.command not in ('plan', 'serve'):
+        propagator.report.shard = org.shard.to_dict() if org.shard else None
+        propagator.report.skipped = dict(org.skipped)
+        propagator.report.print_summary()
+
+        if args.report_file:
+            propagator.report.save(args.report_file)
+
+    RateLimiter.get_instance().report()
+    Metrics.get_instance().report()
+    Metrics.get_instance().close()
+
+    # Repositories that could not be planned are not in the Plan
+    if args.command == 'plan' and plan.failed:
+        sys.exit(1)